@@ -0,0 +1,64 @@
+"""
+Reports how much memory the syntax tree of a script takes, per node and
+per source line, measured with tracemalloc. Only allocations made while
+parsing and still alive afterwards are counted, so the tokens are not.
+
+Run from the repository root:
+    python -m benchmarks.ast_memory --scale 500
+    python -m benchmarks.ast_memory --scale 500 --no-positions
+"""
+import argparse
+import gc
+import io
+import tracemalloc
+
+from lexer.lexer import Lexer
+from lexer.source import BufferedSource
+from parser.parser import Parser
+import parser.nodes as nodes
+
+
+CASES = ["complex_code", "figures", "simple_code", "simple_code_2"]
+
+
+def count_nodes(program: nodes.Program) -> int:
+    return sum(1 for _ in nodes.walk(program))
+
+
+def measure(text: str, **parser_options) -> tuple:
+    """Returns the tree, its size in bytes and the parser which built it."""
+    tokens = Lexer(BufferedSource(io.StringIO(text))).get_all_tokens()
+    parser = Parser.from_tokens(tokens, **parser_options)
+    gc.collect()
+    tracemalloc.start()
+    program = parser.parse_program()
+    del tokens
+    parser.tokens = None
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return program, size, parser
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Syntax tree memory report.")
+    parser.add_argument("-s", "--scale", type=int, default=200, help="Repetitions of the test case scripts.")
+    parser.add_argument("--no-positions", action="store_true",
+                        help="Parse with positions=False, keeping positions in a side table.")
+    args = parser.parse_args()
+
+    cases = []
+    for name in CASES:
+        with open(f"tests/test_cases/{name}.txt", 'r') as f:
+            cases.append(f.read())
+    text = '\n'.join(cases) * args.scale
+    lines = text.count('\n') + 1
+    options = {'positions': False} if args.no_positions else {}
+    program, size, parser = measure(text, **options)
+    count = count_nodes(program)
+    print(f'Lines: {lines:,}  nodes: {count:,}')
+    print(f'Syntax tree: {size:,} bytes, {size / count:.1f} bytes/node, {size / lines:.1f} bytes/line')
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""
+Measures lexer throughput on generated scripts of increasing size.
+Every corpus stresses one kind of token: identifiers, numbers, strings
+with escape sequences or comments.
+
+Run from the repository root:
+    python -m benchmarks.bench_lexer --sizes 0.5 2 --output results.json
+    python -m benchmarks.bench_lexer --compare results.json
+"""
+import argparse
+import io
+import json
+import platform
+import random
+import time
+
+from lexer.lexer import Lexer
+from lexer.source import Source, BufferedSource
+from lexer.tokens import TokenType
+
+
+NAMES = ['a', 'ab', 'scene', 'point_1', 'line_2', 'polyhedron', 'collection', 'x', 'y', 'z']
+
+
+def identifier_statement(rng: random.Random) -> str:
+    names = rng.choices(NAMES, k=4)
+    return f'    {names[0]} = {names[1]}.get_x() + {names[2]} * {names[3]};\n'
+
+
+def numeric_statement(rng: random.Random) -> str:
+    numbers = [str(rng.randrange(10 ** 6)), f'{rng.random() * 1000:.4f}',
+               str(rng.randrange(100)), f'{rng.random():.6f}']
+    return f'    Point p = Point({numbers[0]}, {numbers[1]}, {numbers[2]} - {numbers[3]});\n'
+
+
+def string_statement(rng: random.Random) -> str:
+    words = ' '.join(rng.choices(NAMES, k=6))
+    return f'    print("{words} \\"quoted\\"\\n\\t{rng.randrange(1000)}\\\\");\n'
+
+
+def comment_statement(rng: random.Random) -> str:
+    words = ' '.join(rng.choices(NAMES, k=10))
+    return f'    # {words}\n    a = a + 1;\n'
+
+
+CORPORA = {
+    'identifiers': identifier_statement,
+    'numbers': numeric_statement,
+    'strings': string_statement,
+    'comments': comment_statement,
+}
+
+
+def generate(corpus: str, size: int, seed: int = 0) -> str:
+    """Returns a script of at least size characters made of functions of the given corpus."""
+    rng = random.Random(seed)
+    statement = CORPORA[corpus]
+    parts = []
+    length = 0
+    function = 0
+    while length < size:
+        body = ''.join(statement(rng) for _ in range(20))
+        part = f'void f{function}() {{\n{body}}}\n'
+        parts.append(part)
+        length += len(part)
+        function += 1
+    return ''.join(parts)
+
+
+def all_tokens(lexer: Lexer) -> int:
+    return len(lexer.get_all_tokens())
+
+
+def next_token(lexer: Lexer) -> int:
+    count = 1
+    while lexer.get_next_token().type != TokenType.EOF:
+        count += 1
+    return count
+
+
+METHODS = {
+    'get_all_tokens': all_tokens,
+    'get_next_token': next_token,
+}
+
+# name: (source class, lexer engine)
+ENGINES = {
+    'source': (Source, 'classic'),
+    'buffered': (BufferedSource, 'classic'),
+    'table': (BufferedSource, 'table'),
+}
+
+
+def measure(text: str, engine: str, method: str, repeat: int, skip_comments: bool = False) -> dict:
+    """Lexes text repeat times and returns the best throughput."""
+    source_class, lexer_engine = ENGINES[engine]
+    best = float('inf')
+    for _ in range(repeat):
+        lexer = Lexer(source_class(io.StringIO(text)), engine=lexer_engine, skip_comments=skip_comments)
+        start = time.perf_counter()
+        tokens = METHODS[method](lexer)
+        best = min(best, time.perf_counter() - start)
+    size = len(text.encode('utf-8'))
+    return {
+        'tokens': tokens,
+        'bytes': size,
+        'seconds': best,
+        'tokens_per_s': tokens / best,
+        'bytes_per_s': size / best,
+    }
+
+
+def run(sizes: list[float], corpora: list[str], engines: list[str], repeat: int,
+        skip_comments: bool = False) -> list[dict]:
+    results = []
+    print(f'{"corpus":<12}{"MB":>6}  {"engine":<10}{"method":<16}{"tokens/s":>14}{"MB/s":>8}')
+    for corpus in corpora:
+        for size in sizes:
+            text = generate(corpus, int(size * 1024 * 1024))
+            for engine in engines:
+                for method in METHODS:
+                    result = measure(text, engine, method, repeat, skip_comments)
+                    result.update(corpus=corpus, size_mb=size, engine=engine, method=method)
+                    results.append(result)
+                    print(f'{corpus:<12}{size:>6}  {engine:<10}{method:<16}'
+                          f'{result["tokens_per_s"]:>14,.0f}{result["bytes_per_s"] / 2 ** 20:>8.2f}')
+    return results
+
+
+def key(result: dict) -> tuple:
+    return (result['corpus'], result['size_mb'], result['engine'], result['method'])
+
+
+def compare(results: list[dict], path: str) -> None:
+    """Prints the throughput of results relative to results saved in path."""
+    with open(path, 'r') as f:
+        previous = {key(result): result for result in json.load(f)['results']}
+    print(f'\nCompared with {path}:')
+    for result in results:
+        if old := previous.get(key(result)):
+            ratio = result['tokens_per_s'] / old['tokens_per_s']
+            print(f'{" ".join(str(part) for part in key(result)):<48}{ratio:>8.2f}x')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Lexer throughput benchmark.")
+    parser.add_argument("-s", "--sizes", type=float, nargs='+', default=[0.25, 1], help="Script sizes in MB.")
+    parser.add_argument("-c", "--corpora", nargs='+', choices=list(CORPORA), default=list(CORPORA))
+    parser.add_argument("-e", "--engines", nargs='+', choices=list(ENGINES), default=list(ENGINES))
+    parser.add_argument("-r", "--repeat", type=int, default=3, help="Runs per measurement, the best is kept.")
+    parser.add_argument("--skip-comments", action="store_true", help="Lex with skip_comments=True.")
+    parser.add_argument("-o", "--output", help="Save the results as JSON.")
+    parser.add_argument("--compare", help="JSON results of a previous run to compare with.")
+    args = parser.parse_args()
+
+    results = run(args.sizes, args.corpora, args.engines, args.repeat, args.skip_comments)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'python': platform.python_version(), 'results': results}, f, indent=2)
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Measures how fast the interpreter loops:
+- walking a List with a for loop compared to the equivalent while loop
+  over indexes. Both scripts build the same List first; the time of
+  building it alone is subtracted,
+- counting with a for loop over range() compared to a while loop
+  incrementing a counter,
+- a loop computing literal-only expressions, with and without the
+  constant folding of Interpreter(optimize=True).
+
+Run from the repository root:
+    python -m benchmarks.bench_loops --length 20000
+"""
+import argparse
+import io
+import time
+
+from interpreter.interpreter import Interpreter
+
+
+# List() would share its default list between runs, List(0) gets its own
+BUILD = """
+    List values = List(0);
+    int i = 1;
+    while (i < {length}) {{
+        values.add(i);
+        i = i + 1;
+    }}
+"""
+
+LOOPS = {
+    'build only': "",
+    'while': """
+    int total = 0;
+    int j = 0;
+    int n = values.length();
+    while (j < n) {
+        total = total + values.get(j);
+        j = j + 1;
+    }
+""",
+    'for': """
+    int total = 0;
+    for (int value in values) {
+        total = total + value;
+    }
+""",
+}
+
+
+COUNTED = {
+    'while': """
+    int total = 0;
+    int i = 0;
+    while (i < {length}) {{
+        total = total + i;
+        i = i + 1;
+    }}
+""",
+    'range': """
+    int total = 0;
+    for (int i in range(0, {length})) {{
+        total = total + i;
+    }}
+""",
+}
+
+
+CONSTANT = """
+    float x = 0.0;
+    for (int i in range(0, {length})) {{
+        x = x + 2 * 0.5 * (3 - 1) / 4 + i * (10 / 4 - 0.5);
+    }}
+"""
+
+
+def script(length: int, loop: str) -> str:
+    return 'int main() {' + BUILD.format(length=length) + loop + '    return 0;\n}\n'
+
+
+def measure(text: str, repeat: int, **options) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        interpreter = Interpreter(io.StringIO(text), **options)
+        start = time.perf_counter()
+        interpreter.run()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="List iteration benchmark.")
+    parser.add_argument("-n", "--length", type=int, default=20000, help="Number of values in the List.")
+    parser.add_argument("-r", "--repeat", type=int, default=3, help="Runs per measurement, the best is kept.")
+    args = parser.parse_args()
+
+    print('List')
+    build = measure(script(args.length, LOOPS['build only']), args.repeat)
+    print(f'{"build only":<12}{build:>8.3f} s')
+    for name in ('while', 'for'):
+        seconds = measure(script(args.length, LOOPS[name]), args.repeat) - build
+        print(f'{name:<12}{seconds:>8.3f} s{args.length / seconds:>14,.0f} iterations/s')
+    print('\nCounted')
+    for name, loop in COUNTED.items():
+        text = 'int main() {' + loop.format(length=args.length) + '    return 0;\n}\n'
+        seconds = measure(text, args.repeat)
+        print(f'{name:<12}{seconds:>8.3f} s{args.length / seconds:>14,.0f} iterations/s')
+    print('\nConstant expressions')
+    text = 'int main() {' + CONSTANT.format(length=args.length) + '    return 0;\n}\n'
+    for name, optimize in (('plain', False), ('folded', True)):
+        seconds = measure(text, args.repeat, optimize=optimize)
+        print(f'{name:<12}{seconds:>8.3f} s{args.length / seconds:>14,.0f} iterations/s')
+
+
+if __name__ == "__main__":
+    main()
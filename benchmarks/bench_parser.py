@@ -0,0 +1,256 @@
+"""
+Measures parser throughput and checks that the optimized parser builds
+the same trees as the code it replaced:
+- the precedence-climbing expression parser against the recursive descent
+  through one method per precedence level, on expression-dense code,
+- the statement dispatch table against trying every statement in turn,
+  on the test case scripts repeated --scale times,
+- the parser over an indexed token array against the token stream, in
+  both of the above,
+- lazy function bodies against parsing them up front, on a library of
+  --functions functions of which main calls one.
+
+Run from the repository root:
+    python -m benchmarks.bench_parser --statements 20000 --scale 2000 --functions 5000
+"""
+import argparse
+import functools
+import gc
+import hashlib
+import io
+import random
+import time
+
+from errors.errors import InvalidSyntaxError
+from lexer.lexer import Lexer
+from lexer.source import BufferedSource
+from lexer.tokens import TokenType
+from parser.parser import Parser, OPERATORS
+from parser.indexed import IndexedParser
+import parser.nodes as nodes
+
+
+class DescentParser(Parser):
+    """Parser with the previous expression parsing, one method per precedence level."""
+
+    def parse_expression(self):
+        return self.parse_or_expression()
+
+    def parse_or_expression(self):
+        column = self.current_token.pos[0]
+        line = self.current_token.pos[1]
+        left = self.parse_and_expression()
+        if left is None:
+            return None
+        while self.get_current_token_type() == TokenType.OR:
+            operator = OPERATORS[self.get_current_token_type()]
+            self.consume()
+            right = self.parse_and_expression()
+            if right is None:
+                raise InvalidSyntaxError(
+                    self.current_token.pos[0], self.current_token.pos[1],
+                    "Expected expression after 'or' operator."
+                )
+            left = nodes.BinaryExpression(left, operator, right, column, line)
+        return left
+
+    def parse_and_expression(self):
+        column = self.current_token.pos[0]
+        line = self.current_token.pos[1]
+        left = self.parse_comparison_expression()
+        if left is None:
+            return None
+        while self.get_current_token_type() == TokenType.AND:
+            operator = OPERATORS[self.get_current_token_type()]
+            self.consume()
+            right = self.parse_comparison_expression()
+            if right is None:
+                raise InvalidSyntaxError(
+                    self.current_token.pos[0], self.current_token.pos[1],
+                    "Expected expression after 'and' operator."
+                )
+            left = nodes.BinaryExpression(left, operator, right, column, line)
+        return left
+
+    def parse_comparison_expression(self):
+        column = self.current_token.pos[0]
+        line = self.current_token.pos[1]
+        left = self.parse_additive_expression()
+        if left is None:
+            return None
+        while self.get_current_token_type() in self.COMPARISON_TOKENS:
+            operator = OPERATORS[self.get_current_token_type()]
+            self.consume()
+            right = self.parse_additive_expression()
+            if right is None:
+                raise InvalidSyntaxError(
+                    self.current_token.pos[0], self.current_token.pos[1],
+                    "Expected expression after comparison operator."
+                )
+            left = nodes.BinaryExpression(left, operator, right, column, line)
+        return left
+
+    def parse_additive_expression(self):
+        column = self.current_token.pos[0]
+        line = self.current_token.pos[1]
+        left = self.parse_multiplicative_expression()
+        if left is None:
+            return None
+        while self.get_current_token_type() in [TokenType.PLUS, TokenType.MINUS]:
+            operator = OPERATORS[self.get_current_token_type()]
+            self.consume()
+            right = self.parse_multiplicative_expression()
+            if right is None:
+                raise InvalidSyntaxError(
+                    self.current_token.pos[0], self.current_token.pos[1],
+                    "Expected expression after additive operator."
+                )
+            left = nodes.BinaryExpression(left, operator, right, column, line)
+        return left
+
+    def parse_multiplicative_expression(self):
+        column = self.current_token.pos[0]
+        line = self.current_token.pos[1]
+        left = self.parse_negation_expression()
+        if left is None:
+            return None
+        while self.get_current_token_type() in [TokenType.MUL, TokenType.DIV]:
+            operator = OPERATORS[self.get_current_token_type()]
+            self.consume()
+            right = self.parse_negation_expression()
+            if right is None:
+                raise InvalidSyntaxError(
+                    self.current_token.pos[0], self.current_token.pos[1],
+                    "Expected expression after multiplicative operator."
+                )
+            left = nodes.BinaryExpression(left, operator, right, column, line)
+        return left
+
+
+class SequentialParser(Parser):
+    """Parser with the previous statement parsing, trying every statement in turn."""
+
+    def parse_statement(self):
+        return self.parse_return_statement() or self.parse_if_statement() or self.parse_while_statement() or self.parse_declaration_statement() or self.parse_identifier_statements()
+
+    def parse_function_type(self) -> nodes.FunctionType:
+        if not self.tokens_or_null(self.VARIABLE_TOKENS + [TokenType.VOID]):
+            return None
+        column = self.current_token.pos[0]
+        line = self.current_token.pos[1]
+        type = self.get_current_token_value()
+        self.consume()
+        return nodes.FunctionType(type, column, line)
+
+
+CASES = ["complex_code", "figures", "simple_code", "simple_code_2"]
+
+
+BINARY = ['+', '-', '*', '/', '<', '>', '<=', '>=', '==', '!=', 'and', 'or']
+OPERANDS = ['a', 'b', 'count', '1', '2.5', '42', 'True', '"s"', 'p.get_x()', 'f(a, 2)']
+
+
+def expression(rng: random.Random, depth: int) -> str:
+    if depth == 0 or rng.random() < 0.2:
+        operand = rng.choice(OPERANDS)
+        return f'-{operand}' if rng.random() < 0.1 else operand
+    left = expression(rng, depth - 1)
+    right = expression(rng, depth - 1)
+    text = f'{left} {rng.choice(BINARY)} {right}'
+    return f'({text})' if rng.random() < 0.3 else text
+
+
+def generate(statements: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    body = ''.join(f'    x = {expression(rng, 4)};\n' for _ in range(statements))
+    return f'int main() {{\n{body}    return 0;\n}}\n'
+
+
+def library(functions: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    parts = []
+    for number in range(functions):
+        body = ''.join(f'    float v{i} = {expression(rng, 3)};\n    if (v{i} > 1) {{ v{i} = v{i} - 1; }}\n'
+                       for i in range(5))
+        parts.append(f'float f{number}(float a, float b) {{\n{body}    return v0;\n}}\n')
+    parts.append('int main() {\n    float x = f0(1.0, 2.0);\n    return 0;\n}\n')
+    return ''.join(parts)
+
+
+def force(program: nodes.Program) -> nodes.Program:
+    """Parses the lazy function bodies of program."""
+    for function in program.functions:
+        if isinstance(function.block, nodes.LazyBlock):
+            function.block = function.block.get_block()
+    return program
+
+
+def dump(node):
+    """Returns the structure of a tree, with positions, as comparable tuples."""
+    if isinstance(node, list):
+        return [dump(item) for item in node]
+    if not isinstance(node, nodes.Node):
+        return node
+    fields = vars(node) if hasattr(node, '__dict__') else {
+        name: getattr(node, name) for cls in type(node).__mro__
+        for name in getattr(cls, '__slots__', ()) if hasattr(node, name)}
+    return (type(node).__name__, tuple((name, dump(value)) for name, value in sorted(fields.items())))
+
+
+def lex(text: str) -> list:
+    return Lexer(BufferedSource(io.StringIO(text))).get_all_tokens()
+
+
+def measure(make_parser, text: str, repeat: int):
+    best = float('inf')
+    for _ in range(repeat):
+        parser = make_parser(lex(text))  # fresh tokens, positions are cached on them
+        program = None
+        gc.collect()
+        start = time.perf_counter()
+        program = parser.parse_program()
+        best = min(best, time.perf_counter() - start)
+    return program, best
+
+
+def compare(text: str, parsers: list, repeat: int) -> None:
+    """
+    Parses text with every parser and prints the speed of each.
+    :param parsers: (name, function creating a parser from tokens) pairs.
+    """
+    tokens = len(lex(text))
+    print(f'Script size: {len(text):,} characters, {tokens:,} tokens')
+    trees = []
+    for name, make_parser in parsers:
+        program, seconds = measure(make_parser, text, repeat)
+        trees.append(hashlib.sha256(repr(dump(force(program))).encode()).digest())
+        program = None
+        print(f'{name:<12}{seconds:>8.3f} s{tokens / seconds:>14,.0f} tokens/s')
+    print('Same trees:', all(tree == trees[0] for tree in trees))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parser throughput benchmark.")
+    parser.add_argument("-n", "--statements", type=int, default=20000, help="Number of assignment statements.")
+    parser.add_argument("-s", "--scale", type=int, default=2000, help="Repetitions of the test case scripts.")
+    parser.add_argument("-f", "--functions", type=int, default=5000, help="Functions in the library script.")
+    parser.add_argument("-r", "--repeat", type=int, default=3, help="Runs per measurement, the best is kept.")
+    args = parser.parse_args()
+
+    print('Expressions')
+    compare(generate(args.statements), [('descent', DescentParser.from_tokens), ('precedence', Parser.from_tokens),
+                                        ('indexed', IndexedParser.from_tokens)], args.repeat)
+    cases = []
+    for name in CASES:
+        with open(f"tests/test_cases/{name}.txt", 'r') as f:
+            cases.append(f.read())
+    print('\nTest cases')
+    compare('\n'.join(cases) * args.scale, [('sequential', SequentialParser.from_tokens), ('dispatch', Parser.from_tokens),
+                                             ('indexed', IndexedParser.from_tokens)], args.repeat)
+    print('\nLibrary')
+    compare(library(args.functions), [('eager', Parser.from_tokens),
+                                      ('lazy', functools.partial(Parser.from_tokens, lazy=True))], args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Compares character throughput of Source and BufferedSource, and token
+throughput of the classic and table lexer engines.
+
+Run from the repository root:
+    python -m benchmarks.bench_source --size 2
+"""
+import argparse
+import io
+import time
+
+from lexer.lexer import Lexer
+from lexer.source import Source, BufferedSource
+
+
+def build_script(size: int) -> str:
+    """Repeats the complex test case until the text has at least size characters."""
+    with open("tests/test_cases/complex_code.txt", 'r') as f:
+        sample = f.read()
+    return sample * (size // len(sample) + 1)
+
+
+def walk_chars(source) -> int:
+    count = 0
+    while source.get_next_char() != '':
+        count += 1
+    return count
+
+
+def measure(name: str, text: str, source_class, engine: str = 'classic') -> None:
+    source = source_class(io.StringIO(text))
+    start = time.perf_counter()
+    chars = walk_chars(source)
+    chars_time = time.perf_counter() - start
+
+    lexer = Lexer(source_class(io.StringIO(text)), engine=engine)
+    start = time.perf_counter()
+    tokens = len(lexer.get_all_tokens())
+    tokens_time = time.perf_counter() - start
+
+    print(f'{name:<16}{chars / chars_time:>16,.0f} chars/s{tokens / tokens_time:>16,.0f} tokens/s')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Source throughput benchmark.")
+    parser.add_argument("-s", "--size", type=float, default=2, help="Script size in MB.")
+    args = parser.parse_args()
+
+    text = build_script(int(args.size * 1024 * 1024))
+    print(f'Script size: {len(text):,} characters')
+    measure('Source', text, Source)
+    measure('BufferedSource', text, BufferedSource)
+    measure('  + table engine', text, BufferedSource, 'table')
+
+
+if __name__ == "__main__":
+    main()
@@ -8,6 +8,9 @@ class InvalidTokenError(Exception):
         text = f'Error occured in line {line}, column {column}: \nInvalid character \'{char}\''
         self.message = text
         super().__init__(self.message)
+        self.column = column
+        self.line = line
+        self.args = (column, line, char)  # lets the error be pickled between processes
 
     def __str__(self):
         return self.message
@@ -21,6 +24,9 @@ class ExceedsMaxLengthError(Exception):
         text = f'Error occured in line {line}, column {column}: \n{message} exceeds max length'
         self.message = text
         super().__init__(self.message)
+        self.column = column
+        self.line = line
+        self.args = (column, line, message)  # lets the error be pickled between processes
 
     def __str__(self):
         return self.message
@@ -30,11 +36,30 @@ class UndefEscapeChar(Exception):
         text = f'Error occured in line {line}, column {column}: \nInvalid character \'{char}\''
         self.message = text
         super().__init__(self.message)
+        self.column = column
+        self.line = line
+        self.args = (column, line, char)  # lets the error be pickled between processes
 
     def __str__(self):
         return self.message
     
 
+class UnclosedStringError(ValueError):
+    """Exception raised when lexer reaches the end of the source inside a string
+    """
+
+    def __init__(self, column, line):
+        text = f'Error occured in line {line}, column {column}: \nString not closed'
+        self.message = text
+        super().__init__(self.message)
+        self.column = column
+        self.line = line
+        self.args = (column, line)  # lets the error be pickled between processes
+
+    def __str__(self):
+        return self.message
+
+
 class InvalidSyntaxError(Exception):
     """Exception raised when parser meets invalid syntax
     """
@@ -43,6 +68,9 @@ class InvalidSyntaxError(Exception):
         text = f'Error occured in line {line}, column {column}: \nInvalid syntax: ' + message
         self.message = text
         super().__init__(self.message)
+        self.column = column
+        self.line = line
+        self.args = (column, line, message)  # lets the error be pickled between processes
 
     def __str__(self):
         return self.message
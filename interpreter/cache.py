@@ -0,0 +1,109 @@
+import gc
+import hashlib
+import io
+import os
+import pickle
+import tempfile
+
+from lexer.source import Source, BufferedSource, MmapSource
+
+
+# Part of every key: change it whenever the nodes or the parser change,
+# so that trees cached by an older version are never loaded.
+INTERPRETER_VERSION = '1'
+
+
+class ASTCache:
+    """
+    Directory of parsed programs, one pickle file per script, named after
+    the hash of the script text and INTERPRETER_VERSION. Files are written
+    to a temporary name and renamed, so several processes can share the
+    directory: a reader sees either a whole file or none. Unreadable files
+    count as misses. When the directory grows over max_size bytes the
+    least recently used files, by modification time, are removed.
+    """
+    MAX_SIZE = 1 << 28
+    SUFFIX = '.ast'
+
+    def __init__(self, directory: str, max_size: int = MAX_SIZE) -> None:
+        self.directory = directory
+        self.max_size = max_size
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, source, lazy: bool = False) -> tuple:
+        """
+        Returns the key of the script in source and a Source to parse it
+        from. Streams are read whole; memory-mapped files are hashed in place.
+        :param source: A Source which has not been read yet, or a text stream.
+        :param lazy: The lazy option of the Parser. Trees parsed lazily keep
+        unparsed bodies, whose syntax errors an eager parse would report,
+        so they are cached under a different key.
+        """
+        options = b'lazy' if lazy else b'eager'
+        digest = hashlib.sha256(INTERPRETER_VERSION.encode() + b'\0' + options + b'\0')
+        if isinstance(source, MmapSource):
+            digest.update(source.map)
+        else:
+            text = source.read_all() if isinstance(source, Source) else source.read()
+            digest.update(text.encode('utf-8'))
+            source = BufferedSource(io.StringIO(text))
+        return digest.hexdigest(), source
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, key + self.SUFFIX)
+
+    def load(self, key: str):
+        """Returns the cached program, or None if there is none or it cannot be read."""
+        path = self.path(key)
+        enabled = gc.isenabled()
+        gc.disable()  # loading only creates acyclic nodes, collections would find nothing
+        try:
+            with open(path, 'rb') as f:
+                program = pickle.load(f)
+        except Exception:  # missing, truncated, corrupted or from an incompatible build
+            return None
+        finally:
+            if enabled:
+                gc.enable()
+        try:
+            os.utime(path)  # marks it as recently used
+        except OSError:
+            pass
+        return program
+
+    def store(self, key: str, program) -> bool:
+        """Saves program under key. Returns False if it could not be saved."""
+        descriptor, temporary = tempfile.mkstemp(suffix='.tmp', dir=self.directory)
+        try:
+            with os.fdopen(descriptor, 'wb') as f:
+                pickle.dump(program, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temporary, self.path(key))
+        except (OSError, pickle.PicklingError, RecursionError):
+            try:
+                os.remove(temporary)
+            except OSError:
+                pass
+            return False
+        self.evict()
+        return True
+
+    def evict(self) -> None:
+        """Removes the least recently used files until the cache fits in max_size."""
+        entries = []
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith(self.SUFFIX):
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:  # removed by another process
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+        size = sum(entry[1] for entry in entries)
+        for _, file_size, path in sorted(entries):
+            if size <= self.max_size:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            size -= file_size
@@ -29,6 +29,15 @@ class List:
         return len(self.values)
 
 
+class Range:
+    """Integers from start to stop by step, produced one by one while iterated."""
+    def __init__(self, start: int, stop: int, step: int = 1):
+        self.values = range(start, stop, step)
+
+    def __str__(self):
+        return f'range({self.values.start}, {self.values.stop}, {self.values.step})'
+
+
 class Point:
     def __init__(self, x: float, y, z):
         self.x = x
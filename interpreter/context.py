@@ -19,6 +19,9 @@ class Context:
             return self.parent.get_variable(name)
         raise e.UndeclaredVariableError(name)
 
+    def remove_variable(self, name: str):
+        self.variables.pop(name, None)
+
     def get_variable_in_current_context(self, name: str):
         if name in self.variables.keys():
             return self.variables[name]
@@ -44,6 +47,7 @@ class Context:
 class ContextManager:
     BUILT_IN = {
         'List': ['add', 'remove', 'get', 'length'],
+        'range': [],
         'Point': ['get_x', 'get_y', 'get_z', 'set_x', 'set_y', 'set_z'],
         'Line': ['get_start', 'get_end', 'set_start', 'set_end', 'length'],
         'Polyhedron': ['points', 'lines'],
@@ -56,6 +60,9 @@ class ContextManager:
     def add_variable(self, name: str, value, type):
         self.current_context.add_variable(name, value, type)
 
+    def remove_variable(self, name: str):
+        self.current_context.remove_variable(name)
+
     def get_variable_value(self, name: str):
         return self.current_context.get_variable(name)[0]
 
@@ -2,17 +2,44 @@ from lexer.lexer import Lexer
 from lexer.source import Source
 from parser.parser import Parser
 from interpreter.visitor import Visitor
+from interpreter.cache import ASTCache
+from interpreter.optimizer import Optimizer
 
 
 class Interpreter:
-    def __init__(self, source):
-        self.data = Source(source)  
-        self.lexer = Lexer(self.data)
-        self.parser = Parser(self.lexer)
+    def __init__(self, source, cache: ASTCache | None = None, lazy: bool = False,
+                 optimize: bool = False):
+        """
+        :param cache: If given, the program is loaded from it instead of
+        being parsed when the script was cached before, and saved to it
+        after parsing otherwise.
+        :param lazy: Parse function bodies only when they are first called.
+        :param optimize: Fold constant expressions and remove dead code
+        before running, see Optimizer, which is then available as
+        self.optimizer.
+        """
+        self.cache = cache
+        self.optimizer = Optimizer() if optimize else None
+        self.program = None
+        if cache is not None:
+            self.key, source = cache.key(source, lazy)
+            self.program = cache.load(self.key)
+        self.data = source if isinstance(source, Source) else Source(source)
+        if self.program is None:
+            self.lexer = Lexer(self.data, skip_comments=True)
+            self.parser = Parser(self.lexer, lazy=lazy)
+        else:
+            self.lexer = self.parser = None
         self.visitor = Visitor()
 
 
     def run(self):
-        program = self.parser.parse_program()
+        program = self.program
+        if program is None:
+            program = self.parser.parse_program()
+            if self.cache is not None:
+                self.cache.store(self.key, program)
+        if self.optimizer is not None:
+            program = self.optimizer.optimize(program)
         program.accept(self.visitor)
         return self.visitor.last_result
@@ -0,0 +1,191 @@
+from collections import Counter
+
+from lexer.tokens import TokenType
+import parser.nodes as nodes
+from interpreter.visitor import Visitor
+
+
+# Literal node classes by the type of the value they hold. Strings are
+# never folded: the Visitor looks a string up as a variable name first.
+LITERALS = {int: nodes.IntValue, float: nodes.FloatValue, bool: nodes.BoolValue}
+
+# Types whose declarations without a value cannot fail
+DEFAULT_TYPES = ('int', 'float', 'bool', 'string')
+
+
+class Optimizer:
+    """
+    Rewrites a parsed program before it is run. Binary and negation
+    expressions whose operands are all int, float or bool literals are
+    replaced by a literal of their value, computed with the operations of
+    the Visitor, so the result is exactly what running them would give.
+    Expressions which fail, e.g. a division by zero, are kept, so the
+    error is still raised at run time, with its position, and only if the
+    expression is reached. Bodies still skimmed by Parser(lazy=True) are
+    not optimized.
+
+    Algebraic identities such as x * 1 or x + 0 are deliberately not
+    applied. Types are only known at run time: a name may be resolved in
+    the context of a caller, and the Visitor passes a variable on by its
+    name, e.g. List(x) keeps the name while List(x * 1) keeps the value.
+    The only operands whose type is known are literals, which are folded
+    already. Even for numbers -0.0 + 0 is 0.0, and x * 0 would drop the
+    errors raised by evaluating x.
+
+    Then dead code is removed: statements after a return, branches of if
+    and while statements with a literal condition which are never taken,
+    and declarations of variables used nowhere in the program, with a
+    literal or no value, outside loops. The last statement of a block is
+    kept in any case, since the value it leaves becomes the result of a
+    function without a return.
+    """
+
+    def __init__(self) -> None:
+        self.semantics = Visitor()
+        self.folded = 0  # expressions replaced by literals
+        self.removed = 0  # nodes removed as dead code
+
+    def optimize(self, program: nodes.Program) -> nodes.Program:
+        self.transform(program)
+        unused = self.unused_variables(program)
+        for function in program.functions:
+            if isinstance(function.block, nodes.Block):
+                self.remove_declarations(function.block, unused, False)
+        return program
+
+    def transform(self, node):
+        """Optimizes the nodes below node and returns the node to use in its place."""
+        names = nodes.fields(type(node))
+        if names is None or isinstance(node, nodes.LazyBlock):
+            return node
+        for name in names:
+            value = getattr(node, name, None)
+            if type(value) is list:
+                value[:] = [self.transform(item) for item in value]
+            elif nodes.fields(type(value)) is not None:
+                setattr(node, name, self.transform(value))
+        if isinstance(node, nodes.Block):
+            self.prune(node)
+        elif isinstance(node, nodes.BinaryExpression):
+            return self.fold_binary(node)
+        elif isinstance(node, nodes.NegationExpression):
+            return self.fold_negation(node)
+        return node
+
+    def fold_binary(self, expression: nodes.BinaryExpression):
+        if not (self.is_constant(expression.left) and self.is_constant(expression.right)):
+            return expression
+        try:
+            value = self.semantics.binary_operation(expression.operator, expression.left.value,
+                                                    expression.right.value, expression.column, expression.line)
+        except Exception:  # raised again when the expression is run
+            return expression
+        return self.literal(value, expression)
+
+    def fold_negation(self, expression: nodes.NegationExpression):
+        if not self.is_constant(expression.expression):
+            return expression
+        try:
+            value = self.semantics.negation(expression.operator, expression.expression.value,
+                                            expression.column, expression.line)
+        except Exception:
+            return expression
+        return self.literal(value, expression)
+
+    def is_constant(self, node) -> bool:
+        return type(node) in (nodes.IntValue, nodes.FloatValue, nodes.BoolValue)
+
+    def literal(self, value, expression):
+        literal_class = LITERALS.get(type(value))
+        if literal_class is None:
+            return expression
+        self.folded += 1
+        return literal_class(value, expression.column, expression.line)
+
+    def prune(self, block: nodes.Block) -> None:
+        """Removes the statements of block which are never run, its nested blocks are pruned already."""
+        statements = []
+        last = len(block.statements) - 1
+        for i, statement in enumerate(block.statements):
+            statements.extend(self.taken_statements(statement, i == last))
+        for i, statement in enumerate(statements):
+            # the Visitor only stops at a return which has a value, a call may have none
+            if isinstance(statement, nodes.ReturnStatement) and not isinstance(
+                    statement.expression, (nodes.FunctionCallStatement, nodes.MethodCallExpression)):
+                self.removed += sum(self.size(dead) for dead in statements[i + 1:])
+                del statements[i + 1:]
+                break
+        block.statements[:] = statements
+
+    def taken_statements(self, statement, last: bool) -> list:
+        """Returns the statements to run in place of statement."""
+        if type(getattr(statement, 'condition', None)) is not nodes.BoolValue:
+            return [statement]
+        if isinstance(statement, nodes.IfStatement):
+            taken = statement.block if statement.condition.value else statement.else_block
+            statements = taken.statements if taken is not None else []
+        elif isinstance(statement, nodes.WhileStatement) and not statement.condition.value:
+            statements = []
+        else:
+            return [statement]
+        if last and not statements:  # running it leaves a value, see the class docstring
+            return [statement]
+        if any(isinstance(node, nodes.ReturnStatement) for kept in statements for node in nodes.walk(kept)):
+            # a return in a nested block does not stop a later return of the enclosing one,
+            # copied into the enclosing block it would
+            return [statement]
+        self.removed += self.size(statement) - sum(self.size(kept) for kept in statements)
+        return statements
+
+    def unused_variables(self, program: nodes.Program) -> set:
+        """
+        Returns the names declared once and used nowhere in program. Any
+        name or string in the program counts as a use, since the Visitor
+        looks strings up as variables too.
+        """
+        declared = Counter()
+        used = set()
+        for node in nodes.walk(program):
+            if isinstance(node, nodes.LazyBlock):
+                used.update(token.value for token in node.tokens or ()
+                            if token.type in (TokenType.IDENTIFIER, TokenType.STRING_VALUE))
+                continue
+            for name in nodes.fields(type(node)):
+                value = getattr(node, name, None)
+                if type(value) is not str:
+                    continue
+                if name == 'identifier' and isinstance(
+                        node, (nodes.DeclarationStatement, nodes.Parameter, nodes.ForStatement)):
+                    declared[value] += 1
+                else:
+                    used.add(value)
+        return {name for name, count in declared.items() if count == 1 and name not in used}
+
+    def remove_declarations(self, block: nodes.Block, unused: set, in_loop: bool) -> None:
+        """Removes the declarations of unused variables from block and the blocks in it."""
+        statements = []
+        last = len(block.statements) - 1
+        for i, statement in enumerate(block.statements):
+            if (not in_loop and i != last and isinstance(statement, nodes.DeclarationStatement)
+                    and statement.identifier in unused and self.is_pure(statement)):
+                self.removed += self.size(statement)
+                continue
+            statements.append(statement)
+            if isinstance(statement, nodes.IfStatement):
+                self.remove_declarations(statement.block, unused, in_loop)
+                if statement.else_block is not None:
+                    self.remove_declarations(statement.else_block, unused, in_loop)
+            elif isinstance(statement, (nodes.WhileStatement, nodes.ForStatement)):
+                # a declaration run twice raises a redefinition error, which must stay
+                self.remove_declarations(statement.block, unused, True)
+        block.statements[:] = statements
+
+    def is_pure(self, declaration: nodes.DeclarationStatement) -> bool:
+        """Whether running declaration cannot fail and has no effect but the new variable."""
+        if declaration.expression is None:
+            return declaration.variable_type.type in DEFAULT_TYPES
+        return type(declaration.expression) in (nodes.IntValue, nodes.FloatValue,
+                                                 nodes.BoolValue, nodes.StringValue)
+
+    def size(self, node) -> int:
+        return sum(1 for _ in nodes.walk(node))
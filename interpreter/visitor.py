@@ -6,6 +6,10 @@ import errors.errors as e
 from parser.parser import Operators
 
 
+# Python types of the values of variables of the simple types
+PYTHON_TYPES = {'int': int, 'float': float, 'bool': bool, 'string': str}
+
+
 class Visitor(MainVisitor):
     def __init__(self):
         self.context_manager = ContextManager()
@@ -53,15 +57,18 @@ class Visitor(MainVisitor):
         if self.is_variable(expression):
             expression = self.context_manager.get_variable_value(expression)
 
-        operator = negation_expression.operator
+        self.last_result = self.negation(negation_expression.operator, expression,
+                                         negation_expression.column, negation_expression.line)
+
+    def negation(self, operator, expression, column, line):
         if operator == Operators.MINUS:
             if not isinstance(expression, (int, float)):
-                    raise e.InvalidTypeError("Negation requires numeric types", negation_expression.column, negation_expression.line)
-            self.last_result = -expression
+                    raise e.InvalidTypeError("Negation requires numeric types", column, line)
+            return -expression
         elif operator == Operators.NOT:
             if not isinstance(expression, bool):
-                    raise e.InvalidTypeError("Logical NOT requires a boolean type", negation_expression.column, negation_expression.line)
-            self.last_result = not expression
+                    raise e.InvalidTypeError("Logical NOT requires a boolean type", column, line)
+            return not expression
 
     def visit_method_call_expression(self, method_call_expression: nodes.MethodCallExpression):
         method_call_expression.caller.accept(self)
@@ -93,21 +100,24 @@ class Visitor(MainVisitor):
         if self.is_variable(right):
             right = self.context_manager.get_variable_value(right)
 
-        operator = binary_expression.operator
+        self.last_result = self.binary_operation(binary_expression.operator, left, right,
+                                                 binary_expression.column, binary_expression.line)
+
+    def binary_operation(self, operator, left, right, column, line):
         if operator == Operators.PLUS:
-            self.last_result = self.binary_plus(left, right)
+            return self.binary_plus(left, right)
         elif operator == Operators.MINUS:
-            self.last_result = self.binary_minus(left, right, binary_expression.column, binary_expression.line)
+            return self.binary_minus(left, right, column, line)
         elif operator == Operators.MUL:
-            self.last_result = self.binary_mult(left, right, binary_expression.column, binary_expression.line)
+            return self.binary_mult(left, right, column, line)
         elif operator == Operators.DIV:
-            self.last_result = self.binary_div(left, right, binary_expression.column, binary_expression.line)
+            return self.binary_div(left, right, column, line)
         elif operator in (Operators.GREATER, Operators.LE, Operators.GE, Operators.EQ, Operators.NEQ, Operators.LESS):
-            self.last_result = self.comparison(operator, left, right, binary_expression.column, binary_expression.line)
+            return self.comparison(operator, left, right, column, line)
         elif operator == Operators.AND:
-            self.last_result = self.logical_and(left, right, binary_expression.column, binary_expression.line)
+            return self.logical_and(left, right, column, line)
         elif operator == Operators.OR:
-            self.last_result = self.logical_or(left, right, binary_expression.column, binary_expression.line)
+            return self.logical_or(left, right, column, line)
 
     def binary_plus(self, left, right):
         if isinstance(left, str) or isinstance(right, str):
@@ -225,6 +235,43 @@ class Visitor(MainVisitor):
         else:  
             self.last_result = None
 
+    def visit_for_statement(self, for_statement: nodes.ForStatement):
+        for_statement.variable_type.accept(self)
+        variable_type = self.last_result
+        identifier = for_statement.identifier
+        for_statement.iterable.accept(self)
+        iterable = self.last_result
+        if self.is_variable(iterable):
+            iterable = self.context_manager.get_variable_value(iterable)
+        if not isinstance(iterable, (c.List, c.Range)):
+            raise e.InvalidTypeError("For loop can only iterate over a List or a range", for_statement.column, for_statement.line)
+        if self.context_manager.is_variable_exists_in_current_context(identifier):
+            raise e.RedefinitionError(identifier, for_statement.column, for_statement.line)
+        expected_type = PYTHON_TYPES.get(variable_type) or getattr(c, variable_type)
+        # a range holds only ints, its values need no check
+        check_types = not isinstance(iterable, c.Range)
+        if not check_types and expected_type is not int:
+            raise e.TypeMismatchError(identifier, for_statement.column, for_statement.line)
+        self.last_result = None
+        add_variable = self.context_manager.add_variable
+        get_variable_value = self.context_manager.get_variable_value
+        get_return_value = self.context_manager.get_return_value
+        block = for_statement.block
+        # the values are iterated directly, the loop variable only lives for the loop
+        try:
+            for value in iterable.values:
+                if check_types:
+                    if self.is_variable(value):  # a List created from variables holds their names
+                        value = get_variable_value(value)
+                    if type(value) is not expected_type:
+                        raise e.TypeMismatchError(identifier, for_statement.column, for_statement.line)
+                add_variable(identifier, value, variable_type)
+                block.accept(self)
+                if get_return_value() is not None:
+                    break
+        finally:
+            self.context_manager.remove_variable(identifier)
+
     def visit_declaration_statement(self, declaration: nodes.DeclarationStatement):
         declaration.variable_type.accept(self)
         variable_type = self.last_result
@@ -355,6 +402,22 @@ class Visitor(MainVisitor):
             new_arguments.append(argument)
         self.last_result = c.Line(new_arguments[0], new_arguments[1])
 
+    def create_range(self, arguments):
+        if not 1 <= len(arguments) <= 3:
+            raise e.InvalidNumberOfArgumentsError('range')
+        new_arguments = []
+        for argument in arguments:
+            if self.is_variable(argument):
+                argument = self.context_manager.get_variable_value(argument)
+            if type(argument) is not int:
+                raise e.InvalidTypeError("range arguments must be 'int'")
+            new_arguments.append(argument)
+        if len(new_arguments) == 1:
+            new_arguments.insert(0, 0)
+        if len(new_arguments) == 3 and new_arguments[2] == 0:
+            raise e.InvalidTypeError("range step must not be 0")
+        self.last_result = c.Range(*new_arguments)
+
     def create_point(self, arguments):
         if len(arguments) != 3:
             raise e.InvalidNumberOfArgumentsError('Point')
@@ -385,9 +448,16 @@ class Visitor(MainVisitor):
             self.create_line(arguments)
         elif function_name == 'Point':
             self.create_point(arguments)
+        elif function_name == 'range':
+            self.create_range(arguments)
         else:
             raise e.UndeclaredFunctionError(function_name)
 
+    def parse_lazy_block(self, function: nodes.Function):
+        """Replaces a body skimmed by Parser(lazy=True) with the parsed Block, on the first call."""
+        if isinstance(function.block, nodes.LazyBlock):
+            function.block = function.block.get_block()
+
     def execute_user_function(self, function_name: str, arguments: list):
         self.context_manager.enter_context(function_name)
         function = self.context_manager.get_function(function_name)
@@ -404,6 +474,7 @@ class Visitor(MainVisitor):
             if eval(parameter_type) != type(value):
                 raise e.TypeMismatchError(parameter.identifier, function.column, function.line)
             self.context_manager.add_variable(name, value, parameter_type)
+        self.parse_lazy_block(function)
         function.block.accept(self)
         return_value = self.last_result
         if self.is_variable(return_value):
@@ -421,6 +492,7 @@ class Visitor(MainVisitor):
 
     def execute_main_function(self, function_name: str):
         function = self.context_manager.get_function(function_name)
+        self.parse_lazy_block(function)
         function.block.accept(self)
         return_value = self.last_result
         if self.is_variable(return_value):
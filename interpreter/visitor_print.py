@@ -173,6 +173,18 @@ class PrintVisitor:
         node.block.accept(self)
         self.indentation -= 2
 
+    def visit_for_statement(self, node):
+        print(f"{self.indent()}ForStatement:")
+        self.indentation += 2
+        print(f"{self.indent()}VariableType:")
+        node.variable_type.accept(self)
+        print(f"{self.indent()}Identifier: {node.identifier}")
+        print(f"{self.indent()}Iterable:")
+        node.iterable.accept(self)
+        print(f"{self.indent()}Block:")
+        node.block.accept(self)
+        self.indentation -= 2
+
     def visit_declaration_statement(self, node):
         print(f"{self.indent()}DeclarationStatement:")
         self.indentation += 2
@@ -1,13 +1,22 @@
 from lexer.tokens import Token, TokenType, Symbol
 from lexer.source import Source
-from errors.errors import InvalidTokenError, ExceedsMaxLengthError, UndefEscapeChar
+from lexer.scanner import (TableScanner, CHAR_CLASSES, char_class, IDENTIFIER_START, DIGIT,
+                           QUOTE, HASH, OPERATOR, END)
+from lexer.token_buffer import TokenBuffer
+from lexer.token_stream import TokenStream
+from errors.errors import InvalidTokenError, ExceedsMaxLengthError, UndefEscapeChar, UnclosedStringError
 
 
 class Lexer:
+    ENGINES = ('classic', 'table')
+
     def __init__(self, source, #is_file: bool = False, 
                  max_int_length: int = 15, 
                  max_float_length: int = 15, 
-                 max_string_length: int = 10 ** 5) -> None:
+                 max_string_length: int = 10 ** 5,
+                 engine: str = 'classic',
+                 skip_comments: bool = False,
+                 recover: bool = False) -> None:
         """
         Initializes the token with the specified data source.
         
@@ -16,26 +25,57 @@ class Lexer:
         :param max_int_length: The maximum length of the integer.
         :param max_float_length: The maximum length of a floating point number.
         :param max_string_length: Maximum length of the string.
+        :param engine: 'classic' tries the _try_build_* methods in turn,
+            'table' uses TableScanner and needs a BufferedSource.
+        :param skip_comments: Whether comments are skipped instead of
+            returned as COMMENT tokens. Skipped comments are not limited
+            by max_string_length, since their text is never built.
+        :param recover: Whether lexical errors are recorded in
+            self.errors instead of raised. Invalid characters are
+            skipped, undefined escapes are kept as the character after
+            the backslash, too long tokens are kept whole and an
+            unclosed string ends at the end of the source.
         """
         self.source = source
         self.MAX_INT_LENGTH = max_int_length
         self.MAX_FLOAT_LENGTH = max_float_length
         self.MAX_STRING_LENGTH = max_string_length
+        if engine not in self.ENGINES:
+            raise ValueError(f'Unknown lexer engine \'{engine}\'')
+        self.engine = engine
+        self.skip_comments = skip_comments
+        self.recover = recover
+        self.errors = []
+        self.identifiers = {}  # interned identifier strings
+        self.builders = {
+            IDENTIFIER_START: self._try_build_identifier,
+            QUOTE: self._try_build_string,
+            HASH: self._try_build_comment,
+            DIGIT: self._try_build_number,
+            OPERATOR: self._try_build_chars,
+            END: self._try_build_eof
+        }
+        if engine == 'table':
+            self.get_next_token = TableScanner(self).get_next_token
 
    
 
 
     def _try_build_identifier(self) -> Token:
-        if self.source.get_current_char().isalpha():
+        char = self.source.get_current_char()
+        if char.isalpha():
             builder = []
-            position = self.source.get_position()
-            while self.source.get_current_char().isalnum() or self.source.get_current_char() == '_':
-                if len(builder) >= self.MAX_STRING_LENGTH:
-                    raise ExceedsMaxLengthError(self.source.get_position()[0], self.source.get_position()[1], 'Identifier')
-                builder.append(self.source.get_current_char())
-                self.source.get_next_char()
+            offset = self.source.get_offset()
+            limit = self.MAX_STRING_LENGTH
+            while char.isalnum() or char == '_':
+                if len(builder) >= limit:
+                    self.report(ExceedsMaxLengthError(self.source.get_position()[0], self.source.get_position()[1], 'Identifier'))
+                    limit = float('inf')  # in recover mode the whole identifier is kept
+                builder.append(char)
+                char = self.source.get_next_char()
             value = ''.join(builder)
-            return Token(type=Symbol.keywords.get(value, TokenType.IDENTIFIER), value=value, pos=position)
+            value = self.identifiers.setdefault(value, value)
+            return Token(type=Symbol.keywords.get(value, TokenType.IDENTIFIER), value=value, offset=offset, line_starts=self.source.line_starts)
  
 
 
@@ -53,68 +93,78 @@ class Lexer:
             case "'":
                 return "\'"
             case _:
-                raise UndefEscapeChar(self.source.get_position()[0], self.source.get_position()[1], self.source.get_current_char())
+                self.report(UndefEscapeChar(self.source.get_position()[0], self.source.get_position()[1], self.source.get_current_char()))
+                return self.source.get_current_char()
                 # If the character is not supported throw an error
                 #raise ValueError(f"Unsupported escape sequence: \\{self.source.get_current_char()}")
             
     def _try_build_string(self) -> Token:
         if self.source.get_current_char() == '"':
             builder = []
-            position = self.source.get_position()
+            offset = self.source.get_offset()
             self.source.get_next_char()  # skip onen '
+            limit = self.MAX_STRING_LENGTH
             while self.source.get_current_char() != '"' and self.source.get_current_char() != '':
-                if len(builder) >= self.MAX_STRING_LENGTH:
-                    raise ExceedsMaxLengthError(self.source.get_position()[0], self.source.get_position()[1], 'String')
+                if len(builder) >= limit:
+                    self.report(ExceedsMaxLengthError(self.source.get_position()[0], self.source.get_position()[1], 'String'))
+                    limit = float('inf')
                 if self.source.get_current_char() == '\\':
                     char_to_add = self._parse_escape_sequence()
                 else:
                     char_to_add = self.source.get_current_char()
                 builder.append(char_to_add)
                 self.source.get_next_char()
+            token = Token(type=TokenType.STRING_VALUE, value=''.join(builder), offset=offset, line_starts=self.source.line_starts)
             if self.source.get_current_char() != '"':
-                raise ValueError('String not closed')
+                self.report(UnclosedStringError(*token.pos))  # in recover mode the string ends at EOF
             self.source.get_next_char()  # skip closing '
-            value = ''.join(builder)
-            return Token(type=TokenType.STRING_VALUE, value=value, pos=position)
+            return token
 
     def _try_build_comment(self) -> Token:
         if self.source.get_current_char() == '#':
             builder = []
-            position = self.source.get_position()
+            offset = self.source.get_offset()
             self.source.get_next_char()
+            limit = self.MAX_STRING_LENGTH
             while self.source.get_current_char() != '\n' and self.source.get_current_char() != '':
-                if len(builder) >= self.MAX_STRING_LENGTH:
-                    raise ExceedsMaxLengthError(self.source.get_position()[0], self.source.get_position()[1], 'Comment')
+                if len(builder) >= limit:
+                    self.report(ExceedsMaxLengthError(self.source.get_position()[0], self.source.get_position()[1], 'Comment'))
+                    limit = float('inf')
                 builder.append(self.source.get_current_char())
                 self.source.get_next_char()
             value = ''.join(builder)
-            return Token(type=TokenType.COMMENT, value=value, pos=position)
+            return Token(type=TokenType.COMMENT, value=value, offset=offset, line_starts=self.source.line_starts)
 
 
     def _try_build_number(self) -> Token:
-        if self.source.get_current_char().isdecimal():
+        char = self.source.get_current_char()
+        if char.isdecimal():
             builder = []
-            position = self.source.get_position()
-            while self.source.get_current_char().isdecimal(): #mamy budowac watrosc int przez obecna wart *10 + next wart
-                if len(builder) >= self.MAX_INT_LENGTH:
-                    raise ExceedsMaxLengthError(self.source.get_position()[0], self.source.get_position()[1], 'Integer')
-                builder.append(self.source.get_current_char())
-                self.source.get_next_char()
-            if self.source.get_current_char() == '.':
-                builder.append(self.source.get_current_char())
-                self.source.get_next_char()
-                while self.source.get_current_char().isdecimal():
-                    if len(builder) >= self.MAX_FLOAT_LENGTH:
-                        raise ExceedsMaxLengthError(self.source.get_position()[0], self.source.get_position()[1], 'Float')
-                    builder.append(self.source.get_current_char())
-                    self.source.get_next_char()
-                return Token(type=TokenType.FLOAT_VALUE, value=float(''.join(builder)), pos=position)
-            return Token(type=TokenType.INT_VALUE, value=int(''.join(builder)), pos=position)
+            offset = self.source.get_offset()
+            limit = self.MAX_INT_LENGTH
+            while char.isdecimal(): #mamy budowac watrosc int przez obecna wart *10 + next wart
+                if len(builder) >= limit:
+                    self.report(ExceedsMaxLengthError(self.source.get_position()[0], self.source.get_position()[1], 'Integer'))
+                    limit = float('inf')
+                builder.append(char)
+                char = self.source.get_next_char()
+            if char == '.':
+                builder.append(char)
+                char = self.source.get_next_char()
+                limit = self.MAX_FLOAT_LENGTH
+                while char.isdecimal():
+                    if len(builder) >= limit:
+                        self.report(ExceedsMaxLengthError(self.source.get_position()[0], self.source.get_position()[1], 'Float'))
+                        limit = float('inf')
+                    builder.append(char)
+                    char = self.source.get_next_char()
+                return Token(type=TokenType.FLOAT_VALUE, value=float(''.join(builder)), offset=offset, line_starts=self.source.line_starts)
+            return Token(type=TokenType.INT_VALUE, value=int(''.join(builder)), offset=offset, line_starts=self.source.line_starts)
 
 
     def _try_build_chars(self) -> Token:
         value = self.source.get_current_char() + self.source.seek_next()
-        position = self.source.get_position()
+        offset = self.source.get_offset()
         if token_type:= Symbol.double_chars.get(value):
             self.source.get_next_char()
             self.source.get_next_char()
@@ -123,33 +173,66 @@ class Lexer:
             self.source.get_next_char()
         else:
             return None
-        return Token(type=token_type, value=value, pos=position)
+        return Token(type=token_type, value=value, offset=offset, line_starts=self.source.line_starts)
 
     def _try_build_eof(self) -> Token:
         if self.source.get_current_char() == '':
-            position = (self.source.get_position()[0] + 1, self.source.get_position()[1])
-            return Token(type=TokenType.EOF, value=None, pos=position)
+            column, line = self.source.get_position()
+            return Token(type=TokenType.EOF, value=None, pos=(column + 1, line),
+                         offset=self.source.get_offset(), line_starts=self.source.line_starts)
+
+    def _skip_comments(self) -> None:
+        while self.source.get_current_char() == '#':
+            self.source.skip_line()
+            while (self.source.get_current_char().isspace()):
+                self.source.get_next_char()
 
     def get_next_token(self) -> Token:
-        while (self.source.get_current_char().isspace()):
-            self.source.get_next_char()
-        for fun in [self._try_build_identifier,
-                    self._try_build_string,
-                    self._try_build_comment,
-                    self._try_build_number,
-                    self._try_build_chars,
-                    self._try_build_eof]:
-            token = fun()
-            if token:
+        while True:
+            char = self.source.get_current_char()
+            while char.isspace():
+                char = self.source.get_next_char()
+            if self.skip_comments and char == '#':
+                self._skip_comments()
+                char = self.source.get_current_char()
+            build = self.builders.get(CHAR_CLASSES.get(char) or char_class(char))
+            if build and (token := build()):
                 return token
-        raise InvalidTokenError(self.source.get_position()[0], self.source.get_position()[1], self.source.get_current_char())
+            self.report(InvalidTokenError(self.source.get_position()[0], self.source.get_position()[1], self.source.get_current_char()))
+            self.source.get_next_char()  # in recover mode the character is skipped
 
-    def get_all_tokens(self) -> list[Token]:
+    def report(self, error: Exception) -> None:
+        """Raises error, or in recover mode records it in self.errors."""
+        if not self.recover:
+            raise error
+        self.errors.append(error)
+
+    def get_all_tokens(self, buffer: TokenBuffer | None = None) -> list[Token] | TokenBuffer:
+        """
+        Returns all tokens from the beginning of the source. When a
+        TokenBuffer is given, tokens are appended to it instead of a list.
+        """
         self.source.set_start_position()
-        tokens = []
+        tokens = [] if buffer is None else buffer
         token = self.get_next_token()
         while token.type != TokenType.EOF:
             tokens.append(token)
             token = self.get_next_token()
         tokens.append(token)
         return tokens
+
+    def _generate_tokens(self):
+        token = self.get_next_token()
+        while token.type != TokenType.EOF:
+            yield token
+            token = self.get_next_token()
+        yield token
+
+    def iter_tokens(self, lookahead: int = TokenStream.LOOKAHEAD, skip_comments: bool = False) -> TokenStream:
+        """
+        Returns a stream of tokens from the current position up to and
+        including EOF. Tokens are read lazily, with peek(k) lookahead.
+        :param skip_comments: Whether the stream drops COMMENT tokens, for
+            a lexer which returns them.
+        """
+        return TokenStream(self._generate_tokens(), lookahead, skip_comments)
@@ -0,0 +1,122 @@
+import io
+import mmap
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+from lexer.lexer import Lexer
+from lexer.source import BufferedSource, position_at
+from lexer.token_buffer import TokenBuffer
+
+
+CHUNK_SIZE = 1 << 24
+SPECIAL = re.compile(rb'["#]')
+STRING_REST = re.compile(rb'[^"\\]*(?:\\.[^"\\]*)*"', re.DOTALL)
+
+
+def find_boundaries(data, chunk_size: int = CHUNK_SIZE) -> list[int]:
+    """
+    Returns byte offsets at which data can be split into chunks of about
+    chunk_size bytes. Every chunk but the first starts right after a
+    newline which is not inside a string literal or a comment. The last
+    element is len(data).
+    """
+    boundaries = [0]
+    position = 0
+    target = chunk_size
+    while target < len(data):
+        match = SPECIAL.search(data, position)
+        stop = match.start() if match else len(data)
+        if stop > target:  # the code between position and stop covers target
+            newline = data.find(b'\n', max(position, target), stop)
+            if newline == len(data) - 1:
+                break
+            if newline != -1:
+                boundaries.append(newline + 1)
+                position = newline + 1
+                target = position + chunk_size
+                continue
+        if match is None:
+            break
+        if data[stop] == ord('#'):
+            position = data.find(b'\n', stop)
+        else:
+            string = STRING_REST.match(data, stop + 1)
+            position = string.end() if string else -1
+        if position == -1:  # the comment or string reaches the end of data
+            break
+    boundaries.append(len(data))
+    return boundaries
+
+
+def count_lines(data, start: int, end: int) -> int:
+    """Counts line breaks between start and end as the Source sees them."""
+    chunk = data[start:end]
+    return chunk.count(b'\n') + chunk.count(b'\r') - chunk.count(b'\r\n')
+
+
+def lex_chunk(path: str, start: int, end: int, first_line: int, lexer_options: dict) -> TokenBuffer:
+    """
+    Lexes bytes start:end of the file. Offsets in the returned buffer are
+    relative to the chunk; errors report lines counted from first_line.
+    """
+    with open(path, 'rb') as file:
+        file.seek(start)
+        text = file.read(end - start).decode('utf-8')
+    source = BufferedSource(io.StringIO(text))
+    source.first_line = first_line
+    if start == 0:
+        source.set_start_position()  # starts the file like Lexer.get_all_tokens
+    buffer = TokenBuffer()
+    for token in Lexer(source, **lexer_options).iter_tokens():
+        buffer.append(token)
+    return buffer
+
+
+def stitch(buffers: list[TokenBuffer]) -> TokenBuffer:
+    """
+    Joins chunk buffers into one, shifting offsets and line starts by the
+    length of the preceding chunks. Only the EOF of the last chunk is kept.
+    """
+    result = TokenBuffer()
+    line_starts = result.line_starts = [0]
+    base = 0
+    for number, buffer in enumerate(buffers):
+        count = len(buffer) if number == len(buffers) - 1 else len(buffer) - 1
+        if base and line_starts[-1] != base:
+            line_starts.append(base)
+        line_starts.extend(base + line_start for line_start in buffer.line_starts[1:])
+        value_indexes = [result._intern(value) for value in buffer.value_table]
+        result.types.extend(buffer.types[:count])
+        result.values.extend(value_indexes[index] for index in buffer.values[:count])
+        result.offsets.extend(base + offset for offset in buffer.offsets[:count])
+        base += buffer.offsets[-1]  # EOF is one past the last character
+    column, line = position_at(line_starts, result.offsets[-1])
+    result.positions[len(result) - 1] = (column + 1, line)
+    return result
+
+
+def tokenize_parallel(path: str, workers: int | None = None,
+                      chunk_size: int = CHUNK_SIZE, **lexer_options) -> TokenBuffer:
+    """
+    Lexes a file in chunks in a pool of processes and returns all tokens
+    in one TokenBuffer, with the same positions as lexing it at once.
+    If some chunks fail, the error of the earliest one is raised.
+    :param workers: Number of processes, os.cpu_count() by default.
+    :param lexer_options: Keyword arguments for Lexer, e.g. engine.
+    """
+    workers = workers or os.cpu_count() or 1
+    size = os.path.getsize(path)
+    if workers == 1 or size <= chunk_size:
+        return lex_chunk(path, 0, size, 1, lexer_options)
+    with open(path, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        boundaries = find_boundaries(data, chunk_size)
+        line = 2 if data[:1] in (b'\n', b'\r') else 1  # get_all_tokens counts a leading newline twice
+        first_lines = [1]
+        for start, end in zip(boundaries, boundaries[1:-1]):
+            line += count_lines(data, start, end)
+            first_lines.append(line)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(lex_chunk, path, start, end, first_line, lexer_options)
+                   for start, end, first_line in zip(boundaries, boundaries[1:], first_lines)]
+        return stitch([future.result() for future in futures])
@@ -0,0 +1,229 @@
+import re
+from lexer.tokens import Token, TokenType, Symbol
+from lexer.source import BufferedSource
+from errors.errors import InvalidTokenError, ExceedsMaxLengthError, UndefEscapeChar, UnclosedStringError
+
+
+WHITESPACE = 1
+IDENTIFIER_START = 2
+DIGIT = 3
+QUOTE = 4
+HASH = 5
+OPERATOR = 6
+END = 7
+INVALID = 8
+
+
+def classify(char: str) -> int:
+    """Returns the class of a character which decides how a token starting with it is built."""
+    if char == '':
+        return END
+    if char.isspace():
+        return WHITESPACE
+    if char.isalpha():
+        return IDENTIFIER_START
+    if char == '"':
+        return QUOTE
+    if char == '#':
+        return HASH
+    if char.isdecimal():
+        return DIGIT
+    if char in Symbol.chars:
+        return OPERATOR
+    return INVALID
+
+
+CHAR_CLASSES = {chr(code): classify(chr(code)) for code in range(128)}
+CHAR_CLASSES[''] = END
+
+
+def char_class(char: str) -> int:
+    """
+    Returns the class of a character from the precomputed ASCII table,
+    classifying and caching other characters on first use.
+    """
+    char_class = CHAR_CLASSES.get(char)
+    if char_class is None:
+        char_class = CHAR_CLASSES[char] = classify(char)
+    return char_class
+
+WHITESPACE_PATTERN = re.compile(r'\s*')
+IDENTIFIER_PATTERN = re.compile(r'\w*')
+DIGITS_PATTERN = re.compile(r'\d*')
+COMMENT_PATTERN = re.compile(r'[^\n]*')
+STRING_PATTERN = re.compile(r'[^"\\]*')
+
+ESCAPES = {
+    'n': '\n',
+    't': '\t',
+    '\\': '\\',
+    '"': '\"',
+    "'": "\'"
+}
+
+
+class TableScanner:
+    """
+    Scanning engine which dispatches on the class of the first character
+    of a token and matches the rest of it in bulk over the buffer of
+    a BufferedSource. Produces the same tokens as the Lexer methods.
+    """
+
+    def __init__(self, lexer) -> None:
+        if not isinstance(lexer.source, BufferedSource):
+            raise TypeError('Table engine needs a BufferedSource')
+        self.lexer = lexer
+        self.source = lexer.source
+        self.builders = {
+            IDENTIFIER_START: self._build_identifier,
+            DIGIT: self._build_number,
+            QUOTE: self._build_string,
+            HASH: self._build_comment,
+            OPERATOR: self._build_chars,
+            END: self._build_eof
+        }
+
+    def _char_class(self) -> int:
+        return char_class(self.source.current_char)
+
+    def _match(self, pattern, limit: int) -> str:
+        """
+        Matches pattern at the current character, loading more blocks
+        while the match reaches the end of the buffer and is not
+        longer than limit. The pattern must repeat a single character
+        class, so matching can resume where the previous block ended.
+        """
+        source = self.source
+        length = 0
+        while True:
+            end = pattern.match(source.buffer, source.index + length).end()
+            length = end - source.index
+            if end < len(source.buffer) or length > limit or not source.fill():
+                return source.buffer[source.index:end]
+
+    def get_next_token(self) -> Token:
+        while True:
+            char_class = CHAR_CLASSES.get(self.source.current_char) or self._char_class()
+            if char_class == WHITESPACE:
+                self.source.advance(len(self._match(WHITESPACE_PATTERN, float('inf'))))
+                char_class = self._char_class()
+            if char_class != INVALID:
+                return self.builders[char_class]()
+            self._invalid_character()
+
+    def _build_identifier(self) -> Token:
+        offset = self.source.get_offset()
+        value = self._match(IDENTIFIER_PATTERN, self.lexer.MAX_STRING_LENGTH)
+        if len(value) > self.lexer.MAX_STRING_LENGTH:
+            value = self._too_long(IDENTIFIER_PATTERN, value, self.lexer.MAX_STRING_LENGTH, 'Identifier')
+        else:
+            self.source.advance(len(value))
+        value = self.lexer.identifiers.setdefault(value, value)
+        return Token(type=Symbol.keywords.get(value, TokenType.IDENTIFIER), value=value, offset=offset, line_starts=self.source.line_starts)
+
+    def _build_number(self) -> Token:
+        offset = self.source.get_offset()
+        digits = self._match(DIGITS_PATTERN, self.lexer.MAX_INT_LENGTH)
+        if len(digits) > self.lexer.MAX_INT_LENGTH:
+            digits = self._too_long(DIGITS_PATTERN, digits, self.lexer.MAX_INT_LENGTH, 'Integer')
+        else:
+            self.source.advance(len(digits))
+        if self.source.current_char != '.':
+            return Token(type=TokenType.INT_VALUE, value=int(digits), offset=offset, line_starts=self.source.line_starts)
+        self.source.advance(1)
+        length = len(digits) + 1
+        fraction = self._match(DIGITS_PATTERN, self.lexer.MAX_FLOAT_LENGTH)
+        if fraction and length + len(fraction) > self.lexer.MAX_FLOAT_LENGTH:
+            fraction = self._too_long(DIGITS_PATTERN, fraction, max(self.lexer.MAX_FLOAT_LENGTH - length, 0), 'Float')
+        else:
+            self.source.advance(len(fraction))
+        return Token(type=TokenType.FLOAT_VALUE, value=float(f'{digits}.{fraction}'), offset=offset, line_starts=self.source.line_starts)
+
+    def _build_string(self) -> Token:
+        offset = self.source.get_offset()
+        self.source.advance(1)  # skip opening "
+        builder = []
+        length = 0
+        limit = self.lexer.MAX_STRING_LENGTH
+        while True:
+            chunk = self._match(STRING_PATTERN, limit - length)
+            if length + len(chunk) > limit:
+                builder.append(chunk[:limit - length])
+                self.source.advance(limit - length)
+                self.lexer.report(ExceedsMaxLengthError(self.source.get_position()[0], self.source.get_position()[1], 'String'))
+                length = limit
+                limit = float('inf')  # in recover mode the whole string is kept
+                continue
+            builder.append(chunk)
+            length += len(chunk)
+            char = self.source.advance(len(chunk))
+            if char == '"':
+                self.source.advance(1)  # skip closing "
+                return Token(type=TokenType.STRING_VALUE, value=''.join(builder), offset=offset, line_starts=self.source.line_starts)
+            if char == '':
+                token = Token(type=TokenType.STRING_VALUE, value=''.join(builder), offset=offset, line_starts=self.source.line_starts)
+                self.lexer.report(UnclosedStringError(*token.pos))  # in recover mode the string ends at EOF
+                return token
+            if length >= limit:
+                self.lexer.report(ExceedsMaxLengthError(self.source.get_position()[0], self.source.get_position()[1], 'String'))
+                limit = float('inf')
+            char = self.source.advance(1)  # read the character after '\'
+            if char not in ESCAPES:
+                self.lexer.report(UndefEscapeChar(self.source.get_position()[0], self.source.get_position()[1], char))
+            builder.append(ESCAPES.get(char, char))
+            length += 1
+            if char:  # a '\' at the end of the source escapes nothing
+                self.source.advance(1)
+
+    def _build_comment(self) -> Token:
+        if self.lexer.skip_comments:
+            return self._skip_comments()
+        offset = self.source.get_offset()
+        self.source.advance(1)
+        value = self._match(COMMENT_PATTERN, self.lexer.MAX_STRING_LENGTH)
+        if len(value) > self.lexer.MAX_STRING_LENGTH:
+            value = self._too_long(COMMENT_PATTERN, value, self.lexer.MAX_STRING_LENGTH, 'Comment')
+        else:
+            self.source.advance(len(value))
+        return Token(type=TokenType.COMMENT, value=value, offset=offset, line_starts=self.source.line_starts)
+
+    def _skip_comments(self) -> Token:
+        while self.source.current_char == '#':
+            if self.source.skip_line() == '\n':
+                self.source.advance(len(self._match(WHITESPACE_PATTERN, float('inf'))))
+        return self.get_next_token()
+
+    def _build_chars(self) -> Token:
+        offset = self.source.get_offset()
+        value = self.source.buffer[self.source.index:self.source.index + 2]
+        if len(value) < 2 and self.source.fill():
+            value = self.source.buffer[self.source.index:self.source.index + 2]
+        if token_type := Symbol.double_chars.get(value):
+            self.source.advance(2)
+        else:
+            value = self.source.current_char
+            token_type = Symbol.chars[value]
+            self.source.advance(1)
+        return Token(type=token_type, value=value, offset=offset, line_starts=self.source.line_starts)
+
+    def _build_eof(self) -> Token:
+        column, line = self.source.get_position()
+        return Token(type=TokenType.EOF, value=None, pos=(column + 1, line),
+                     offset=self.source.get_offset(), line_starts=self.source.line_starts)
+
+    def _too_long(self, pattern, value: str, limit: int, name: str) -> str:
+        """
+        Reports value, matched by pattern and longer than limit, at its
+        character after the limit. In recover mode returns the whole
+        value, matching its rest which may not be loaded yet, and moves
+        past it.
+        """
+        self.source.advance(limit)
+        self.lexer.report(ExceedsMaxLengthError(self.source.get_position()[0], self.source.get_position()[1], name))
+        rest = self._match(pattern, float('inf'))
+        self.source.advance(len(rest))
+        return value[:limit] + rest
+
+    def _invalid_character(self) -> None:
+        self.lexer.report(InvalidTokenError(self.source.get_position()[0], self.source.get_position()[1], self.source.get_current_char()))
+        self.source.advance(1)  # in recover mode the character is skipped
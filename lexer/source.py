@@ -1,11 +1,30 @@
+import codecs
+import io
+import mmap
+import os
+from bisect import bisect_right
+
+
+def position_at(line_starts: list[int], offset: int) -> tuple:
+    """
+    Returns the position (column, row) of a character offset.
+    :param line_starts: Offsets of the first character of every line.
+    """
+    line = bisect_right(line_starts, offset) or 1
+    return (offset - line_starts[line - 1] + 1, line)
+
+
 class Source:
     EOL = ['\n', '\r']
+    first_line = 1  # line number reported for the first line of the stream
 
     def __init__(self, stream) -> None:
         self.stream = stream
         #self.check_EOL = False
-        self.column = 0
-        self.line = 1
+        self.offset = -1
+        self.line_starts = [0]
+        self.text = None  # whole text of the stream, read back by get_line
+        self.pushback = ''  # characters read ahead from the stream
         self.current_char = chr(2)
         self.get_next_char()
 
@@ -17,30 +36,37 @@ class Source:
     def seek_next(self) -> str:
            """
            Returns the next character without changing the current position.
+           The character is kept in the pushback buffer, so the stream does
+           not need to be seekable.
            """
-           current_position = self.stream.tell()
-           next_char = self.stream.read(1)
-           self.stream.seek(current_position)
-           return next_char
+           if not self.pushback:
+               self.pushback = self.stream.read(1)
+           return self.pushback[:1]
+
+    def _read_char(self) -> str:
+        if self.pushback:
+            char = self.pushback[0]
+            self.pushback = self.pushback[1:]
+            return char
+        return self.stream.read(1)
 
 
     
     def get_next_char(self) -> str:
         if self.current_char in self.EOL:
-            self.line +=1
-            self.column = 0
+            self.line_starts.append(self.offset + 1)
         if self.current_char == '':
             return self.current_char
-        self.current_char = self.stream.read(1)
+        self.current_char = self._read_char()
         if self.current_char == '\r':
             next_char = self.seek_next()
             if next_char == '\n':  # Check if next character is '\n'
-                self.stream.read(1)  # skip '\n'
+                self._read_char()  # skip '\n'
                 self.current_char = '\n'  # Store as a single character   
             else:
                 self.current_char = '\n'
         #if self.current_char != '': #and not self.check_EOL:
-        self.column += 1
+        self.offset += 1
         #if self.check_EOL:
         #    self.line += 1
         #    self.column = 1
@@ -50,31 +76,88 @@ class Source:
         #    self.check_EOL = False
         return self.current_char
 
+    def get_offset(self) -> int:
+        """Returns the offset of the current character from the beginning."""
+        return self.offset
+
     def get_position(self) -> tuple:
         """Returns the current position (column, row)."""
-        return (self.column, self.line)
+        column, line = position_at(self.line_starts, self.get_offset())
+        return (column, line + self.first_line - 1)
 
     def set_start_position(self) -> None:
         """
-        Resets the stream to the beginning.
+        Resets the stream to the beginning. A non-seekable stream can only
+        be reset while nothing but the first character has been read.
         """
-        self.column = 0
-        self.line = 1
-        self.stream.seek(0)
+        if self.stream.seekable():
+            self.stream.seek(0)
+            self.pushback = ''
+        elif self.offset > 0:
+            raise io.UnsupportedOperation('Cannot go back to the beginning of a non-seekable stream')
+        else:
+            self.pushback = self.current_char + self.pushback
+        self.offset = -1
+        self.line_starts = [0]
         self.current_char = self.get_next_char()
 
+    def skip_line(self) -> str:
+        """
+        Moves to the end of the current line without collecting its text.
+        Returns the new current character ('\n' or '' at the end).
+        """
+        while self.current_char != '\n' and self.current_char != '':
+            self.get_next_char()
+        return self.current_char
+
+    def _read_text(self) -> str:
+        """
+        Returns the whole text of the stream, with line endings normalized
+        like get_next_char does, so the offsets in line_starts index it.
+        It is read once, from a seekable stream only, and the position of
+        the stream is kept.
+        """
+        if self.text is None:
+            if not self.stream.seekable():
+                raise io.UnsupportedOperation('Cannot read lines back from a non-seekable stream')
+            current_position = self.stream.tell()
+            self.stream.seek(0)
+            self.text = self.stream.read().replace('\r\n', '\n').replace('\r', '\n')
+            self.stream.seek(current_position)
+        return self.text
+
     def get_line(self, line: int) -> str:
         """
-        Returns the text of a specific string
+        Returns the text of a specific string. Lines already read start at
+        the offsets in line_starts, later ones are searched in the text.
+        Needs a seekable stream, see _read_text.
         :param line: Line number (strat with 1).
         """
-        current_position = self.stream.tell()
-        self.stream.seek(0)
-        for _ in range(line - 1):
-            self.stream.readline()
-        readed_line = self.stream.readline()
-        self.stream.seek(current_position)
-        return readed_line
+        text = self._read_text()
+        if line <= len(self.line_starts):
+            start = self.line_starts[line - 1]
+        else:
+            start = self.line_starts[-1]
+            for _ in range(line - len(self.line_starts)):
+                start = text.find('\n', start) + 1
+                if not start:
+                    return ''
+        end = text.find('\n', start)
+        return text[start:] if end == -1 else text[start:end + 1]
+
+    def get_lines(self, lines: range) -> list[str]:
+        """
+        Returns the text of several lines, e.g. the context around an error.
+        :param lines: Range of line numbers (strat with 1).
+        """
+        return [self.get_line(line) for line in lines]
+
+    def read_all(self) -> str:
+        """
+        Returns the text from the current character to the end of the
+        stream. The characters are consumed.
+        """
+        return self.current_char + self.pushback + self.stream.read()
 
     def read(self, size=-1):
         return self.stream.read(size)
@@ -84,3 +167,206 @@ class Source:
 
     def tell(self):
         return self.stream.tell()
+
+
+class BufferedSource(Source):
+    """
+    Source which reads the stream in large blocks and serves characters
+    and lookahead from an in-memory buffer instead of calling read(1).
+    Line endings are normalized to '\\n' when a block is loaded.
+    """
+    BLOCK_SIZE = 1 << 16
+
+    def __init__(self, stream, block_size: int = BLOCK_SIZE) -> None:
+        self.block_size = block_size
+        self.buffer = ''
+        self.buffer_start = 0
+        self.index = -1
+        self.eof = False
+        super().__init__(stream)
+
+    def _read_block(self, size: int) -> str:
+        return self.stream.read(size)
+
+    def fill(self) -> bool:
+        """
+        Drops already consumed characters and appends the next block
+        to the buffer. Returns False when the stream is exhausted.
+        """
+        if self.eof:
+            return False
+        block = self._read_block(self.block_size)
+        if not block:
+            self.eof = True
+            return False
+        while block[-1] == '\r':  # keep '\r\n' in one block
+            next_char = self._read_block(1)
+            if not next_char:
+                break
+            block += next_char
+        block = block.replace('\r\n', '\n').replace('\r', '\n')
+        keep = max(self.index, 0)
+        self.buffer = self.buffer[keep:] + block
+        self.buffer_start += keep
+        self.index -= keep
+        return True
+
+    def read_all(self) -> str:
+        while self.fill():
+            pass
+        return self.buffer[max(self.index, 0):]
+
+    def seek_next(self) -> str:
+        """
+        Returns the next character without changing the current position.
+        """
+        if self.index + 1 >= len(self.buffer) and not self.fill():
+            return ''
+        return self.buffer[self.index + 1]
+
+    def get_next_char(self) -> str:
+        current_char = self.current_char
+        if current_char == '\n':
+            self.line_starts.append(self.buffer_start + self.index + 1)
+        elif current_char == '':
+            return current_char
+        self.index += 1
+        try:
+            current_char = self.buffer[self.index]
+        except IndexError:
+            current_char = self.buffer[self.index] if self.fill() else ''
+        self.current_char = current_char
+        return current_char
+
+    def advance(self, count: int) -> str:
+        """
+        Moves count characters forward at once, updating the position
+        like count calls of get_next_char. The skipped characters must
+        already be in the buffer.
+        """
+        start = self.index
+        end = start + count
+        newline = self.buffer.find('\n', start, end)
+        while newline != -1:
+            self.line_starts.append(self.buffer_start + newline + 1)
+            newline = self.buffer.find('\n', newline + 1, end)
+        self.index = end
+        try:
+            self.current_char = self.buffer[end]
+        except IndexError:
+            self.current_char = self.buffer[self.index] if self.fill() else ''
+        return self.current_char
+
+    def get_offset(self) -> int:
+        """Returns the offset of the current character from the beginning."""
+        return self.buffer_start + self.index
+
+    def skip_line(self) -> str:
+        """
+        Moves to the end of the current line without collecting its text,
+        searching the buffer for the newline block by block.
+        """
+        while True:
+            end = self.buffer.find('\n', self.index)
+            if end != -1:
+                return self.advance(end - self.index)
+            if self.advance(len(self.buffer) - self.index) == '':
+                return ''
+
+    def _rewind(self) -> None:
+        if not self.stream.seekable():
+            raise io.UnsupportedOperation('Cannot go back to the beginning of a non-seekable stream')
+        self.stream.seek(0)
+
+    def set_start_position(self) -> None:
+        """
+        Resets the source to the beginning. While the buffer still starts
+        at the beginning of the text it is reused, otherwise the stream is
+        rewound, which needs a seekable stream.
+        """
+        self.line_starts = [0]
+        if self.buffer_start:
+            self._rewind()
+            self.buffer = ''
+            self.buffer_start = 0
+            self.eof = False
+        self.index = -1
+        self.current_char = self.get_next_char()
+
+
+class MmapSource(BufferedSource):
+    """
+    BufferedSource backed by a memory-mapped file. Bytes are decoded as
+    UTF-8 block by block, so only the current window of the file exists
+    as Python strings and already scanned pages are released.
+    """
+    RELEASE_SIZE = 1 << 24
+
+    def __init__(self, path: str, block_size: int = BufferedSource.BLOCK_SIZE) -> None:
+        self.file = open(path, 'rb')
+        if os.fstat(self.file.fileno()).st_size:
+            self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+            if hasattr(mmap, 'MADV_SEQUENTIAL'):
+                self.map.madvise(mmap.MADV_SEQUENTIAL)
+        else:
+            self.map = b''  # empty files cannot be mapped
+        self.map_position = 0
+        self.released = 0
+        self.line_offsets = [0]  # byte offsets of the lines in the map, found by get_line
+        self.lines_indexed = False
+        self.decoder = codecs.getincrementaldecoder('utf-8')()
+        super().__init__(None, block_size)
+
+    def _read_block(self, size: int) -> str:
+        text = ''
+        while not text and self.map_position < len(self.map):
+            chunk = self.map[self.map_position:self.map_position + size]
+            self.map_position += len(chunk)
+            text = self.decoder.decode(chunk, final=self.map_position >= len(self.map))
+        self._release_pages()
+        return text
+
+    def _release_pages(self) -> None:
+        """Drops already decoded pages from resident memory."""
+        if not hasattr(mmap, 'MADV_DONTNEED') or not isinstance(self.map, mmap.mmap):
+            return
+        end = self.map_position - self.map_position % mmap.PAGESIZE
+        if end - self.released >= self.RELEASE_SIZE:
+            self.map.madvise(mmap.MADV_DONTNEED, self.released, end - self.released)
+            self.released = end
+
+    def _rewind(self) -> None:
+        self.map_position = 0
+        self.released = 0
+        self.decoder.reset()
+
+    def _index_lines(self, line: int) -> None:
+        while len(self.line_offsets) < line and not self.lines_indexed:
+            end = self.map.find(b'\n', self.line_offsets[-1])
+            if end == -1:
+                self.lines_indexed = True
+                break
+            self.line_offsets.append(end + 1)
+
+    def get_line(self, line: int) -> str:
+        """
+        Returns the text of a specific string
+        :param line: Line number (strat with 1).
+        """
+        self._index_lines(line + 1)
+        if line > len(self.line_offsets):
+            return ''
+        start = self.line_offsets[line - 1]
+        end = self.line_offsets[line] if line < len(self.line_offsets) else len(self.map)
+        return self.map[start:end].decode('utf-8').replace('\r\n', '\n')
+
+    def close(self) -> None:
+        if isinstance(self.map, mmap.mmap):
+            self.map.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
@@ -0,0 +1,129 @@
+from array import array
+from lexer.source import position_at
+from lexer.tokens import Token, TokenType
+
+
+TOKEN_TYPES = list(TokenType)
+TYPE_CODES = {token_type: code for code, token_type in enumerate(TOKEN_TYPES)}
+
+
+class TokenView:
+    """
+    Read-only view of one token stored in a TokenBuffer. Has the same
+    attributes as Token but keeps only the buffer and an index.
+    """
+    __slots__ = ('buffer', 'index')
+
+    def __init__(self, buffer, index: int) -> None:
+        self.buffer = buffer
+        self.index = index
+
+    @property
+    def type(self) -> TokenType:
+        return TOKEN_TYPES[self.buffer.types[self.index]]
+
+    @property
+    def value(self):
+        return self.buffer.value_table[self.buffer.values[self.index]]
+
+    @property
+    def offset(self) -> int:
+        return self.buffer.offsets[self.index]
+
+    @property
+    def pos(self) -> tuple:
+        return self.buffer.position(self.index)
+
+    def __str__(self) -> str:
+        return f'Token({self.type}, {self.value}, {self.pos[0]}, {self.pos[1]})'
+
+
+class TokenBuffer:
+    """
+    Compact struct-of-arrays token storage. Token types are kept as bytes,
+    positions as source offsets and values as indexes into a table in
+    which every distinct value is stored once. Columns and rows are
+    computed from the line_starts table of the source when needed.
+    """
+
+    def __init__(self) -> None:
+        self.types = array('B')
+        self.offsets = array('q')
+        self.values = array('I')
+        self.value_table = [None]
+        self.value_indexes = {(type(None), None): 0}
+        self.line_starts = None
+        self.positions = {}  # explicit (column, row) of tokens, e.g. EOF
+
+    def _intern(self, value) -> int:
+        key = (value.__class__, value)  # keeps 1, 1.0 and True apart
+        index = self.value_indexes.get(key)
+        if index is None:
+            index = self.value_indexes[key] = len(self.value_table)
+            self.value_table.append(value)
+        return index
+
+    def add(self, type: TokenType, value, pos: tuple = None,
+            offset: int = None, line_starts: list[int] = None) -> None:
+        """
+        Adds a token. Its position is given either explicitly as pos or
+        as an offset into the source with the line_starts table.
+        """
+        if self.line_starts is None:
+            self.line_starts = line_starts
+        if offset is None or line_starts is not self.line_starts:
+            pos = pos or position_at(line_starts, offset)
+        if pos is not None:
+            self.positions[len(self.types)] = pos
+        self.types.append(TYPE_CODES[type])
+        self.values.append(self._intern(value))
+        self.offsets.append(-1 if offset is None else offset)
+
+    def append(self, token: Token | TokenView) -> None:
+        if isinstance(token, TokenView):
+            buffer = token.buffer
+            self.add(token.type, token.value, buffer.positions.get(token.index), token.offset, buffer.line_starts)
+        else:
+            self.add(token.type, token.value, token._pos, token.offset, token.line_starts)
+
+    def position(self, index: int) -> tuple:
+        """Returns the position (column, row) of the token at index."""
+        pos = self.positions.get(index)
+        if pos is None:
+            pos = position_at(self.line_starts, self.offsets[index])
+        return pos
+
+    def token(self, index: int) -> Token:
+        """Returns a full Token object for the token at index."""
+        view = self[index]
+        return Token(type=view.type, value=view.value, pos=self.positions.get(index),
+                     offset=view.offset, line_starts=self.line_starts)
+
+    def slice(self, start: int, end: int) -> 'TokenBuffer':
+        """
+        Returns tokens start:end as a new buffer. The value table and the
+        line starts are shared, so offsets and positions stay the same.
+        """
+        buffer = TokenBuffer()
+        buffer.types = self.types[start:end]
+        buffer.offsets = self.offsets[start:end]
+        buffer.values = self.values[start:end]
+        buffer.value_table = self.value_table
+        buffer.value_indexes = self.value_indexes
+        buffer.line_starts = self.line_starts
+        buffer.positions = {index - start: pos for index, pos in self.positions.items() if start <= index < end}
+        return buffer
+
+    def __len__(self) -> int:
+        return len(self.types)
+
+    def __getitem__(self, index: int) -> TokenView:
+        if index < 0:
+            index += len(self.types)
+        if not 0 <= index < len(self.types):
+            raise IndexError('TokenBuffer index out of range')
+        return TokenView(self, index)
+
+    def __iter__(self):
+        for index in range(len(self.types)):
+            yield TokenView(self, index)
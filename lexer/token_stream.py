@@ -0,0 +1,60 @@
+from collections import deque
+from lexer.tokens import Token, TokenType
+
+
+class TokenStream:
+    """
+    Iterator over tokens with a bounded lookahead window. Tokens are pulled
+    from the underlying iterator only when they are consumed or peeked at,
+    so at most `lookahead` tokens are held in memory.
+    """
+    LOOKAHEAD = 4
+
+    def __init__(self, tokens, lookahead: int = LOOKAHEAD, skip_comments: bool = False) -> None:
+        """
+        :param tokens: Iterable of tokens, normally ending with EOF.
+        :param lookahead: The maximum number of tokens peek can see.
+        :param skip_comments: Whether COMMENT tokens are dropped, so
+            neither iterating nor peek ever returns them.
+        """
+        self.tokens = iter(tokens)
+        self.lookahead = lookahead
+        self.skip_comments = skip_comments
+        self.window = deque()
+        self.last_token = None
+        self.exhausted = False
+
+    def _fill(self, count: int) -> None:
+        while len(self.window) < count and not self.exhausted:
+            token = next(self.tokens, None)
+            if token is None:
+                self.exhausted = True
+                return
+            if self.skip_comments and token.type == TokenType.COMMENT:
+                continue
+            self.window.append(token)
+            if token.type == TokenType.EOF:
+                self.exhausted = True
+
+    def peek(self, k: int = 0) -> Token | None:
+        """
+        Returns the k-th upcoming token (0 is the next one) without
+        consuming it. Past the end of the stream the last token, normally
+        EOF, is returned.
+        """
+        if not 0 <= k < self.lookahead:
+            raise ValueError(f'Can peek at most {self.lookahead} tokens ahead')
+        self._fill(k + 1)
+        if k < len(self.window):
+            return self.window[k]
+        return self.window[-1] if self.window else self.last_token
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> Token:
+        self._fill(1)
+        if not self.window:
+            raise StopIteration
+        self.last_token = self.window.popleft()
+        return self.last_token
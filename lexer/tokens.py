@@ -1,4 +1,5 @@
 from enum import auto, Enum
+from lexer.source import position_at
 
 
 class TokenType(Enum):
@@ -54,10 +55,27 @@ class TokenType(Enum):
 
 
 class Token:
-    def __init__(self, type: TokenType, value: str | int | float | None, pos: tuple) -> None:
+    def __init__(self, type: TokenType, value: str | int | float | None, pos: tuple = None,
+                 offset: int = None, line_starts: list[int] = None) -> None:
+        """
+        :param pos: Position (column, row). When omitted, it is computed
+            on first use from offset and the line_starts table of the source.
+        """
         self.type = type
         self.value = value
-        self.pos = pos
+        self.offset = offset
+        self.line_starts = line_starts
+        self._pos = pos
+
+    @property
+    def pos(self) -> tuple:
+        if self._pos is None:
+            self._pos = position_at(self.line_starts, self.offset)
+        return self._pos
+
+    @pos.setter
+    def pos(self, pos: tuple) -> None:
+        self._pos = pos
 
     def __str__(self) -> str:
         return f'Token({self.type}, {self.value}, {self.pos[0]}, {self.pos[1]})'
@@ -3,19 +3,66 @@ import sys
 import io
 import errors.errors as b
 from interpreter.interpreter import Interpreter
+from interpreter.cache import ASTCache
+from lexer.lexer import Lexer
+from lexer.source import Source, BufferedSource, MmapSource
+from parser.parser import Parser
+
+
+def check(source) -> None:
+    """Prints every lexical and syntax error of the script, without running it."""
+    source = source if isinstance(source, Source) else Source(source)
+    parser = Parser(Lexer(source, skip_comments=True, recover=True))
+    parser.parse_program()
+    for error in parser.errors:
+        print(f'Error: {error}')
+    print(f'{len(parser.errors)} error(s) found.')
+
+
+def execute(source, args, cache: ASTCache | None) -> None:
+    if args.check:
+        check(source)
+    else:
+        interpreter = Interpreter(source, cache, args.lazy, args.optimize)
+        print(interpreter.run())
+        if interpreter.optimizer is not None:
+            optimizer = interpreter.optimizer
+            print(f'Optimizer: {optimizer.folded} expression(s) folded, {optimizer.removed} node(s) removed.',
+                  file=sys.stderr)
+
 
 def main():
     parser = argparse.ArgumentParser(description="Text data processing.")
     parser.add_argument(
         "-f", "--file",
         type=str,
-        help="Path to the file to be processed."
+        help="Path to the file to be processed, '-' reads the script from stdin."
     )
     parser.add_argument(
         "-t", "--text",
         type=str,
         help="Text to be processed."
     )
+    parser.add_argument(
+        "-c", "--cache",
+        type=str,
+        help="Directory in which parsed scripts are cached between runs."
+    )
+    parser.add_argument(
+        "-l", "--lazy",
+        action="store_true",
+        help="Parse function bodies only when they are first called."
+    )
+    parser.add_argument(
+        "-O", "--optimize",
+        action="store_true",
+        help="Fold constant expressions and remove dead code before running the script."
+    )
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="Only report all lexical and syntax errors of the script, do not run it."
+    )
     args = parser.parse_args()
 
 
@@ -25,15 +72,16 @@ def main():
 
 
 
+    cache = ASTCache(args.cache) if args.cache else None
     try:
-        if args.file:
-            with open(args.file, 'r') as file:
-                interpreter = Interpreter(file)
-                print(interpreter.run())
+        if args.file == '-':
+            execute(BufferedSource(sys.stdin), args, cache)
+        elif args.file:
+            with MmapSource(args.file) as source:
+                execute(source, args, cache)
         else:
             a = io.StringIO(args.text)
-            interpreter = Interpreter(a)
-            print(interpreter.run())
+            execute(a, args, cache)
 
     except b.InvalidTokenError as e:
         print(f'Error: Invalid token encountered: {e}')
@@ -41,6 +89,8 @@ def main():
         print(f'Error: Token exceeds maximum allowed length: {e}')
     except b.UndefEscapeChar as e:
         print(f'Error: Undefined escape character: {e}')
+    except b.UnclosedStringError as e:
+        print(f'Error: Unclosed string: {e}')
     except FileNotFoundError:
         print('Error: File Not Found.')
     except b.InvalidSyntaxError as e: 
@@ -71,5 +121,5 @@ def main():
 
 if __name__ == "__main__":
     #sys.argv = ["main.py", "--text", 'int main() { return @; }']
-    sys.argv = ["main.py", "--file", "tests/test_cases/figures.txt"]
+    #sys.argv = ["main.py", "--file", "tests/test_cases/figures.txt"]
     main()
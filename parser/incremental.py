@@ -0,0 +1,124 @@
+import io
+from bisect import bisect_left, bisect_right
+
+from lexer.lexer import Lexer
+from lexer.source import BufferedSource
+from lexer.tokens import TokenType
+from parser.parser import Parser
+import parser.nodes as nodes
+
+
+def normalize_newlines(text: str) -> str:
+    """Converts line breaks the way the Source does, so offsets match token offsets."""
+    return text.replace('\r\n', '\n').replace('\r', '\n')
+
+
+class IncrementalParser:
+    """
+    Keeps the syntax tree of a script up to date while the script is edited.
+    The text is split into segments, one per top-level function, from the
+    start of the function to the start of the next one; the first segment
+    also covers the text before the first function. An edit re-lexes and
+    re-parses only the segments it touches, the other functions are reused
+    with their line numbers shifted. When the edited segments cannot be
+    parsed on their own, e.g. a '}' was removed, the whole script is parsed.
+    Offsets are indexes into self.text, which has '\\n' line breaks only.
+
+    Reused functions are the same objects in the old and the new tree, and
+    their line numbers are shifted in place, so a Program returned before
+    an edit is only valid until that edit: its line numbers may be wrong.
+    """
+
+    def __init__(self, text: str, parser_class=Parser) -> None:
+        self.parser_class = parser_class
+        self.text = normalize_newlines(text)
+        self.program = None
+        self.starts = []  # offset of the first token of every function
+        self.positioned = []  # nodes with a line number, for every function
+        self.parse()
+
+    def parse(self) -> nodes.Program:
+        """Parses the whole text."""
+        self.program = None
+        functions, self.starts, self.positioned = self._parse_functions(self.text, 0, 0)
+        self.program = nodes.Program(functions)
+        return self.program
+
+    def _parse_functions(self, text: str, base: int, first_line: int) -> tuple:
+        """
+        Parses the functions of text, which starts at offset base of the
+        script, in line first_line + 1. Returns the functions, their offsets
+        and their nodes with line numbers.
+        """
+        parser = self.parser_class(Lexer(BufferedSource(io.StringIO(text)), skip_comments=True))
+        functions = []
+        starts = []
+        while True:
+            start = base + parser.current_token.offset
+            function = parser.parse_function()
+            if function is None:
+                break
+            functions.append(function)
+            starts.append(start)
+        parser.require_token(TokenType.EOF, 'Need EOF at the end of stream')
+        positioned = [[node for node in nodes.walk(function) if getattr(node, 'line', None) is not None]
+                      for function in functions]
+        if first_line:
+            shift_lines(positioned, first_line)
+        return functions, starts, positioned
+
+    def segment(self, index: int) -> tuple:
+        """Returns the start and end offsets of the segment of function index."""
+        start = self.starts[index] if index else 0
+        end = self.starts[index + 1] if index + 1 < len(self.starts) else len(self.text)
+        return start, end
+
+    def edit(self, offset: int, removed: int, inserted: str) -> nodes.Program:
+        """
+        Replaces removed characters at offset with inserted and returns the
+        updated tree. Syntax errors are raised like by a full parse; the
+        next edit then parses the whole text again. Programs returned
+        before are invalid afterwards, see the class docstring.
+        """
+        inserted = normalize_newlines(inserted)
+        old_text = self.text
+        end = offset + removed
+        self.text = old_text[:offset] + inserted + old_text[end:]
+        if self.program is None or not self.starts:
+            return self.parse()
+        # segments touching [offset, end], and the following ones starting
+        # on the line where the edit ends, since their columns may change
+        first = max(bisect_right(self.starts, offset) - 1, 0)
+        last = max(bisect_left(self.starts, end) - 1, first)
+        while last + 1 < len(self.starts) and (
+                self.starts[last + 1] <= end or '\n' not in old_text[end:self.starts[last + 1]]):
+            last += 1
+        start, old_stop = self.segment(first)[0], self.segment(last)[1]
+        delta = len(inserted) - removed
+        stop = old_stop + delta
+        line_start = self.text.rfind('\n', 0, start) + 1
+        # spaces in place of the text before the segment keep the columns
+        region = ' ' * (start - line_start) + self.text[start:stop]
+        try:
+            functions, starts, positioned = self._parse_functions(
+                region, line_start, self.text.count('\n', 0, start))
+        except Exception:
+            return self.parse()
+        lines = inserted.count('\n') - old_text.count('\n', offset, end)
+        following = self.program.functions[last + 1:]
+        if lines:
+            shift_lines(self.positioned[last + 1:], lines)
+        self.starts[first:] = starts + [start + delta for start in self.starts[last + 1:]]
+        self.positioned[first:last + 1] = positioned
+        self.program = nodes.Program(self.program.functions[:first] + functions + following)
+        return self.program
+
+
+def shift_lines(positioned: list, lines: int) -> None:
+    """
+    Adds lines to the line numbers of the nodes in lists of nodes. The
+    nodes are changed in place, in every tree which holds them.
+    """
+    for function_nodes in positioned:
+        for node in function_nodes:
+            node.line += lines
@@ -0,0 +1,87 @@
+from lexer.lexer import Lexer
+from lexer.tokens import TokenType, Token
+from lexer.token_buffer import TokenBuffer, TYPE_CODES
+from errors.errors import InvalidSyntaxError
+from parser.parser import Parser
+
+
+class IndexedParser(Parser):
+    """
+    Parser over an array of tokens and the index of the current one, instead
+    of a stream. Any token ahead can be looked at, and going back to a
+    position saved with mark() is only an assignment, so alternatives can be
+    tried with speculate(). Comments are dropped when the array is built.
+    """
+
+    def __init__(self, lexer: Lexer, positions: bool = True, lazy: bool = False,
+                 recover: bool = False) -> None:
+        self.lexer = lexer
+        self.recover = recover or lexer.recover
+        self.errors = self.lexer.errors
+        self._start(list(self.lexer.iter_tokens()), positions, lazy)
+
+    @classmethod
+    def from_tokens(cls, tokens, positions: bool = True, lazy: bool = False,
+                    recover: bool = False) -> 'IndexedParser':
+        """
+        Creates a parser over already produced tokens. A list, or a
+        TokenBuffer without comments, is indexed as it is.
+        """
+        parser = cls.__new__(cls)
+        parser.lexer = None
+        parser.recover = recover
+        parser.errors = []
+        parser._start(tokens, positions, lazy)
+        return parser
+
+    def _start(self, tokens, positions: bool = True, lazy: bool = False) -> None:
+        if isinstance(tokens, TokenBuffer):
+            if TYPE_CODES[TokenType.COMMENT] in tokens.types:
+                tokens = [token for token in tokens if token.type != TokenType.COMMENT]
+        else:
+            tokens = [token for token in tokens if token.type != TokenType.COMMENT]
+        self.index = -1
+        self.last = len(tokens) - 1
+        super()._start(tokens, positions, lazy)
+
+    def consume(self) -> Token:
+        if self.index < self.last:  # past the end the last token, EOF, stays
+            self.index += 1
+            self.current_token = self.tokens[self.index]
+        return self.current_token
+
+    def peek_token(self, k: int = 1) -> Token:
+        """Returns the token k positions after the current one, or the last token."""
+        return self.tokens[min(self.index + k, self.last)]
+
+    def remaining_tokens(self) -> list[Token]:
+        if isinstance(self.tokens, TokenBuffer):
+            tokens = self.tokens.slice(self.index, self.last + 1)
+        else:
+            tokens = self.tokens[self.index:]
+        self.reset(self.last)
+        return tokens
+
+    def mark(self) -> int:
+        """Returns the current position, for reset()."""
+        return self.index
+
+    def reset(self, mark: int) -> None:
+        """Goes back to a position returned by mark()."""
+        self.index = mark
+        self.current_token = self.tokens[mark]
+
+    def speculate(self, parse):
+        """
+        Calls parse() and returns its result. If it returns None or raises
+        InvalidSyntaxError, the tokens it consumed are given back and None
+        is returned.
+        """
+        mark = self.mark()
+        try:
+            result = parse()
+        except InvalidSyntaxError:
+            result = None
+        if result is None:
+            self.reset(mark)
+        return result
@@ -1,10 +1,21 @@
 from abc import ABC, abstractmethod
+from array import array
 
 
 tree_depth = 0
 
 
 class Node(ABC):
+    __slots__ = ()
+
+    # Pickled as a plain tuple of the slot values, e.g. by the AST cache
+    def __getstate__(self):
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def __setstate__(self, state):
+        for name, value in zip(self.__slots__, state):
+            setattr(self, name, value)
+
     @abstractmethod
     def accept(self, visitor):
         pass
@@ -15,6 +26,8 @@ class Node(ABC):
 
 
 class Identifier(Node):
+    __slots__ = ('name', 'column', 'line')
+
     def __init__(self, name: str, column, line):
         self.name = name
         self.column = column
@@ -28,6 +41,8 @@ class Identifier(Node):
 
 
 class BoolValue(Node):
+    __slots__ = ('value', 'column', 'line')
+
     def __init__(self, value: bool, column, line):
         self.value = value
         self.column = column
@@ -41,6 +56,8 @@ class BoolValue(Node):
 
 
 class IntValue(Node):
+    __slots__ = ('value', 'column', 'line')
+
     def __init__(self, value: int, column, line):
         self.value = value
         self.column = column
@@ -54,6 +71,8 @@ class IntValue(Node):
 
 
 class FloatValue(Node):
+    __slots__ = ('value', 'column', 'line')
+
     def __init__(self, value: float, column, line):
         self.value = value
         self.column = column
@@ -67,6 +86,8 @@ class FloatValue(Node):
 
 
 class StringValue(Node):
+    __slots__ = ('value', 'column', 'line')
+
     def __init__(self, value: str, column, line):
         self.value = value
         self.column = column
@@ -80,6 +101,8 @@ class StringValue(Node):
 
 
 class FunctionType(Node):
+    __slots__ = ('type', 'column', 'line')
+
     def __init__(self, type: str, column, line):
         self.type = type
         self.column = column
@@ -93,6 +116,8 @@ class FunctionType(Node):
 
 
 class VariableType(Node):
+    __slots__ = ('type', 'column', 'line')
+
     def __init__(self, type: str, column, line):
         self.type = type
         self.column = column
@@ -106,6 +131,8 @@ class VariableType(Node):
 
 
 class Parameter(Node):
+    __slots__ = ('identifier', 'type', 'column', 'line')
+
     def __init__(self, type: VariableType, identifier: str, column, line): #string a nie Identifier
         self.identifier = identifier
         self.type = type
@@ -124,6 +151,8 @@ class Parameter(Node):
 
 
 class AssignmentExpression(Node):
+    __slots__ = ('identifier', 'expression', 'column', 'line')
+
     def __init__(self, identifier: Identifier, expression, column, line):
         self.identifier = identifier
         self.expression = expression
@@ -145,6 +174,8 @@ class AssignmentExpression(Node):
 
 
 class BinaryExpression(Node):
+    __slots__ = ('left', 'operator', 'right', 'column', 'line')
+
     def __init__(self, left, operator: str, right, column, line):
         self.left = left
         self.operator = operator
@@ -167,6 +198,8 @@ class BinaryExpression(Node):
         return r
 
 class NegationExpression(Node):
+    __slots__ = ('operator', 'expression', 'column', 'line')
+
     def __init__(self, operator, expression, column, line):
         self.operator = operator
         self.expression = expression
@@ -187,6 +220,8 @@ class NegationExpression(Node):
 
 
 class MethodCall(Node):
+    __slots__ = ('name', 'arguments', 'column', 'line')
+
     #def __init__(self, name: Identifier, arguments: list):
     #    self.name = name
     #    self.arguments = arguments
@@ -219,6 +254,8 @@ class MethodCall(Node):
 
 
 class MethodCallExpression(Node):
+    __slots__ = ('caller', 'methods', 'column', 'line')
+
     def __init__(self, caller: Identifier, methods: list[MethodCall], column, line):
         self.caller = caller
         self.methods = methods
@@ -240,6 +277,8 @@ class MethodCallExpression(Node):
 
 
 class FunctionCallStatement(Node):
+    __slots__ = ('identifier', 'arguments', 'column', 'line')
+
     def __init__(self, identifier: Identifier, arguments: list, column, line):
         self.identifier = identifier
         self.arguments = arguments
@@ -264,6 +303,8 @@ class FunctionCallStatement(Node):
 
 
 class Block(Node):
+    __slots__ = ('statements',)
+
     def __init__(self, statements: list):
         self.statements = statements
 
@@ -283,7 +324,40 @@ class Block(Node):
         return r
 
 
+class LazyBlock(Node):
+    """
+    Block whose tokens were collected but not parsed yet. It is parsed
+    by parse(tokens) into a Block when it is first used.
+    """
+    __slots__ = ('tokens', 'parse', 'block')
+
+    def __init__(self, tokens: list, parse):
+        self.tokens = tokens
+        self.parse = parse
+        self.block = None
+
+    def get_block(self) -> Block:
+        if self.block is None:
+            self.block = self.parse(self.tokens)
+            self.tokens = None
+        return self.block
+
+    @property
+    def statements(self) -> list:
+        return self.get_block().statements
+
+    def accept(self, visitor):
+        self.get_block().accept(visitor)
+
+    def __repr__(self) -> str:
+        if self.block is not None:
+            return repr(self.block)
+        return f"\n{' ' * (tree_depth + 3)} LazyBlock: {len(self.tokens)} tokens"
+
+
 class IfStatement(Node):
+    __slots__ = ('condition', 'block', 'else_block', 'column', 'line')
+
     def __init__(self, condition, block: Block, column, line, else_block=None):
         self.condition = condition
         self.block = block
@@ -312,6 +386,8 @@ class IfStatement(Node):
 
 
 class WhileStatement(Node):
+    __slots__ = ('condition', 'block', 'column', 'line')
+
     def __init__(self, condition, block: Block, column, line):
         self.condition = condition
         self.block = block
@@ -333,7 +409,37 @@ class WhileStatement(Node):
         return r
 
 
+class ForStatement(Node):
+    __slots__ = ('variable_type', 'identifier', 'iterable', 'block', 'column', 'line')
+
+    def __init__(self, variable_type: VariableType, identifier: str, iterable, block: Block, column, line):
+        self.variable_type = variable_type
+        self.identifier = identifier
+        self.iterable = iterable
+        self.block = block
+        self.column = column
+        self.line = line
+
+    def accept(self, visitor):
+        visitor.visit_for_statement(self)
+
+    def __repr__(self) -> str:
+        global tree_depth
+        tree_depth += 3
+        r = f"\n{' ' * tree_depth} ForStatement:"
+        tree_depth += 3
+        r += f"\n{' ' * tree_depth} {self.variable_type}"
+        r += f"\n{' ' * tree_depth} VariableName = {self.identifier}"
+        r += f"\n{' ' * tree_depth} Iterable: {self.iterable}"
+        r += f"\n{' ' * tree_depth} ForBlock:"
+        r += f"{' ' * tree_depth} {self.block}"
+        tree_depth -= 6
+        return r
+
+
 class DeclarationStatement(Node):
+    __slots__ = ('variable_type', 'identifier', 'expression', 'column', 'line')
+
     def __init__(self, variable_type: VariableType, identifier: str, column, line, expression=None): #################################
         self.variable_type = variable_type
         self.identifier = identifier
@@ -357,6 +463,8 @@ class DeclarationStatement(Node):
 
 
 class ReturnStatement(Node):
+    __slots__ = ('expression', 'column', 'line')
+
     def __init__(self, expression, column, line):
         self.expression = expression
         self.column = column
@@ -376,6 +484,8 @@ class ReturnStatement(Node):
 
 
 class Function(Node):
+    __slots__ = ('function_type', 'identifier', 'parameters', 'block', 'column', 'line')
+
     def __init__(self, function_type: FunctionType, identifier: str,#Identifier, #identifier: str
                  parameters: list, block: Block, column, line):
         self.function_type = function_type
@@ -406,6 +516,8 @@ class Function(Node):
 
 
 class Program(Node):
+    __slots__ = ('functions',)
+
     def __init__(self, functions: list):
         self.functions = functions
 
@@ -414,7 +526,116 @@ class Program(Node):
 
     def __repr__(self) -> str:
         return f"Program:{self.functions}"
-    
+
+
+_fields = {}  # class: names of its slots, None for classes which are not nodes
+
+
+def fields(cls) -> tuple | None:
+    """Returns the slot names of a node class, or None if cls is not a node class."""
+    try:
+        return _fields[cls]
+    except KeyError:
+        names = tuple(name for base in cls.__mro__ for name in getattr(base, '__slots__', ())) \
+            if issubclass(cls, Node) else None
+        _fields[cls] = names
+        return names
+
+
+def children(node: Node) -> list:
+    """Returns the nodes directly below node, in order."""
+    result = []
+    for name in fields(type(node)):
+        value = getattr(node, name, None)
+        if type(value) is list:
+            result.extend(value)
+        elif fields(type(value)) is not None:
+            result.append(value)
+    return result
+
+
+def walk(node):
+    """Yields node and all nodes below it in preorder."""
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if fields(type(node)) is not None:
+            yield node
+            stack.extend(reversed(children(node)))
+
+
+def _without_positions(cls) -> type:
+    """
+    Returns a copy of the node class cls without the column and line slots,
+    for trees whose positions are kept in a PositionTable. It is registered
+    as a virtual subclass of cls, so isinstance checks still hold, and reads
+    None for column and line, as a node without a position.
+    """
+    namespace = {name: value for name, value in vars(cls).items()
+                 if name not in cls.__slots__ and name not in ('__init__', '__slots__', '_abc_impl')}
+    namespace.update(__slots__=tuple(name for name in cls.__slots__ if name not in ('column', 'line')),
+                     column=None, line=None, __qualname__=f'{cls.__name__}WithoutPosition')
+    twin = type(f'{cls.__name__}WithoutPosition', (Node,), namespace)
+    cls.register(twin)
+    globals()[twin.__name__] = twin  # found by pickle
+    return twin
+
+
+# node class: its copy without positions
+WITHOUT_POSITION = {cls: _without_positions(cls) for cls in Node.__subclasses__() if 'line' in cls.__slots__}
+POSITIONLESS = frozenset(WITHOUT_POSITION.values())
+
+
+class PositionTable:
+    """
+    Positions of the nodes of a tree, kept in two arrays in preorder instead
+    of in the nodes. The nodes are replaced by their copies without the
+    column and line slots. A node is found by its preorder index, counting
+    only those copies, so nodes parsed later from a LazyBlock, which keep
+    their positions, do not shift it. Finding it walks the tree, which
+    normally only happens when an error has to be reported.
+    """
+
+    def __init__(self, program: Program) -> None:
+        self.program = program
+        self.columns = array('I')
+        self.lines = array('I')
+        for node in walk(program):
+            if hasattr(node, 'line'):
+                self.columns.append(node.column)
+                self.lines.append(node.line)
+        # walk takes the children of a node after yielding it, so it goes on with the copies
+        for node in walk(program):
+            for name in fields(type(node)):
+                value = getattr(node, name, None)
+                if type(value) is list:
+                    value[:] = [self.copy(item) for item in value]
+                elif type(value) in WITHOUT_POSITION:
+                    setattr(node, name, self.copy(value))
+
+    def copy(self, node):
+        """Returns node without its position, or node itself if it has none."""
+        cls = WITHOUT_POSITION.get(type(node))
+        if cls is None:
+            return node
+        copy = cls.__new__(cls)
+        for name in cls.__slots__:
+            setattr(copy, name, getattr(node, name))
+        return copy
+
+    def position(self, node: Node) -> tuple:
+        """Returns (column, line) of a node of the tree."""
+        if node.line is not None:  # e.g. parsed later from a LazyBlock
+            return node.column, node.line
+        copies = (other for other in walk(self.program) if type(other) in POSITIONLESS)
+        for i, other in enumerate(copies):
+            if other is node:
+                return self.columns[i], self.lines[i]
+        raise KeyError(node)
+
+    def __len__(self) -> int:
+        return len(self.lines)
+
 
 
 class MainVisitor(ABC):
@@ -490,6 +711,10 @@ class MainVisitor(ABC):
     def visit_while_statement(self, node):
         pass
 
+    @abstractmethod
+    def visit_for_statement(self, node):
+        pass
+
     @abstractmethod
     def visit_declaration_statement(self, node):
         pass
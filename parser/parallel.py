@@ -0,0 +1,126 @@
+import gc
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+from lexer.tokens import TokenType
+from lexer.token_buffer import TokenBuffer, TYPE_CODES
+import parser.nodes as nodes
+
+
+CHUNK_TOKENS = 1 << 16
+LBRACE = TYPE_CODES[TokenType.LBRACE]
+RBRACE = TYPE_CODES[TokenType.RBRACE]
+EOF = TYPE_CODES[TokenType.EOF]
+BRACES = re.compile(b'[' + re.escape(bytes([LBRACE])) + re.escape(bytes([RBRACE])) + b']')
+
+shared = None  # (value table, line starts) of the script, set in every worker
+
+
+def find_function_ends(types) -> list[int] | None:
+    """
+    Returns the index after every '}' which closes a top-level block, or
+    None if the braces are not balanced, so tokens cannot be split safely.
+    :param types: Token type codes, as in TokenBuffer.types.
+    """
+    ends = []
+    depth = 0
+    for match in BRACES.finditer(types):
+        index = match.start()
+        if types[index] == LBRACE:
+            depth += 1
+        else:
+            depth -= 1
+            if depth == 0:
+                ends.append(index + 1)
+            elif depth < 0:
+                return None
+    return ends if depth == 0 else None
+
+
+def split(types, chunk_tokens: int) -> list[tuple] | None:
+    """
+    Returns (start, end) ranges of at least chunk_tokens tokens which end
+    after a top-level block. The last range reaches the end of types.
+    """
+    ends = find_function_ends(types)
+    if ends is None:
+        return None
+    ranges = []
+    start = 0
+    for end in ends:
+        if end - start >= chunk_tokens:
+            ranges.append((start, end))
+            start = end
+    if start < len(types):
+        ranges.append((start, len(types)))
+    return ranges
+
+
+def share(value_table: list, line_starts: list[int]) -> None:
+    global shared
+    shared = (value_table, line_starts)
+
+
+def parse_chunk(parser_class, chunk: tuple, lazy: bool = False) -> list[nodes.Function]:
+    """
+    Parses the functions of one chunk of the script. The chunk holds the
+    arrays of a TokenBuffer slice; the value table and the line starts are
+    shared, so offsets give the same positions as in the whole script.
+    """
+    buffer = TokenBuffer()
+    buffer.types, buffer.values, buffer.offsets, buffer.positions = chunk
+    buffer.value_table, buffer.line_starts = shared
+    last = len(buffer) - 1
+    if buffer.types[last] != EOF:  # ends the chunk where its last token is
+        buffer.positions[last + 1] = buffer.position(last)
+        buffer.types.append(EOF)
+        buffer.values.append(0)
+        buffer.offsets.append(buffer.offsets[last])
+    parser = parser_class.from_tokens(buffer, lazy=lazy)
+    functions = []
+    while function := parser.parse_function():
+        functions.append(function)
+    parser.require_token(TokenType.EOF, 'Need EOF at the end of stream')
+    return functions
+
+
+def parse_parallel(parser_class, tokens, workers: int | None = None,
+                   chunk_tokens: int = CHUNK_TOKENS, lazy: bool = False) -> list[nodes.Function] | None:
+    """
+    Parses the functions of tokens in chunks in a pool of processes.
+    Returns None if the tokens cannot be split, then they should be parsed
+    serially. If some chunks fail, the error of the earliest one is raised,
+    which is the error the serial parser would raise.
+    :param tokens: Tokens without comments. A TokenBuffer is split without
+    going through every token, other sequences are copied into one first.
+    """
+    workers = workers or os.cpu_count() or 1
+    chunk_tokens = max(chunk_tokens, len(tokens) // (workers * 4) + 1)
+    if len(tokens) <= chunk_tokens:
+        return None
+    if not isinstance(tokens, TokenBuffer):
+        buffer = TokenBuffer()
+        for token in tokens:
+            buffer.append(token)
+        tokens = buffer
+    ranges = split(tokens.types, chunk_tokens)
+    if ranges is None or len(ranges) == 1:
+        return None
+    chunks = []
+    for start, end in ranges:
+        chunk = tokens.slice(start, end)
+        chunks.append((chunk.types, chunk.values, chunk.offsets, chunk.positions))
+    enabled = gc.isenabled()
+    gc.disable()  # the received trees are acyclic, collections would find nothing
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=share,
+                                 initargs=(tokens.value_table, tokens.line_starts)) as executor:
+            futures = [executor.submit(parse_chunk, parser_class, chunk, lazy) for chunk in chunks]
+            functions = []
+            for future in futures:
+                functions.extend(future.result())
+    finally:
+        if enabled:
+            gc.enable()
+    return functions
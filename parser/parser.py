@@ -1,7 +1,9 @@
 from lexer.lexer import Lexer
 from lexer.tokens import TokenType, Token
+from lexer.token_stream import TokenStream
 from errors.errors import InvalidSyntaxError
 import parser.nodes as nodes
+import parser.parallel as parallel
 from enum import Enum, auto
 
 class Operators(Enum):
@@ -36,6 +38,21 @@ OPERATORS = {
     TokenType.NOT: Operators.NOT
 }
 
+# Binary operators from the loosest to the tightest binding, with the error
+# reported when the right operand is missing
+PRECEDENCE = [
+    ([TokenType.OR], "Expected expression after 'or' operator."),
+    ([TokenType.AND], "Expected expression after 'and' operator."),
+    ([TokenType.EQ, TokenType.NEQ, TokenType.LE, TokenType.GE, TokenType.GREATER, TokenType.LESS],
+     "Expected expression after comparison operator."),
+    ([TokenType.PLUS, TokenType.MINUS], "Expected expression after additive operator."),
+    ([TokenType.MUL, TokenType.DIV], "Expected expression after multiplicative operator."),
+]
+
+BINDING_POWERS = {token_type: (power, message)
+                  for power, (token_types, message) in enumerate(PRECEDENCE, 1)
+                  for token_type in token_types}
+
 
 
 class Parser:
@@ -46,10 +63,65 @@ class Parser:
                                TokenType.POLYHEDRON, TokenType.COLLECTION]
     COMPARISON_TOKENS = [TokenType.EQ, TokenType.NEQ, TokenType.LE, TokenType.GE,
                          TokenType.GREATER, TokenType.LESS]
-
-    def __init__(self, lexer: Lexer) -> None:
+    FUNCTION_TYPE_TOKENS = frozenset(VARIABLE_TOKENS + [TokenType.VOID])
+
+    def __init__(self, lexer: Lexer, positions: bool = True, lazy: bool = False,
+                 recover: bool = False) -> None:
+        """
+        :param positions: If False, parse_program moves the positions of
+        the nodes to a nodes.PositionTable, available as self.positions,
+        and replaces the nodes by copies without position slots.
+        :param lazy: If True, function bodies are only skimmed to their
+        closing brace and become nodes.LazyBlock, parsed on first use.
+        Syntax errors inside a body are then reported when it is parsed.
+        :param recover: If True, parse_program does not stop at the first
+        syntax error. Syntax errors are collected in self.errors, ordered
+        by position, and parsing resumes after the statement or function
+        containing them. The lexer is used as it was created: its errors
+        are collected too if it was created with recover=True, which also
+        makes the parser recover, otherwise they are raised.
+        """
         self.lexer = lexer
-        self.current_token = self.lexer.get_next_token()
+        self.recover = recover or lexer.recover
+        self.errors = self.lexer.errors
+        # comments never reach the syntax tree, a lexer which returns them is not changed
+        self._start(self.lexer.iter_tokens(skip_comments=True), positions, lazy)
+
+    @classmethod
+    def from_tokens(cls, tokens, positions: bool = True, lazy: bool = False,
+                    recover: bool = False) -> 'Parser':
+        """
+        Creates a parser over already produced tokens, e.g. a list
+        or a TokenBuffer, instead of a lexer.
+        """
+        parser = cls.__new__(cls)
+        parser.lexer = None
+        parser.recover = recover
+        parser.errors = []
+        parser._start(TokenStream(tokens, skip_comments=True), positions, lazy)
+        return parser
+
+    @classmethod
+    def parse_body(cls, tokens: list) -> nodes.Block:
+        """Parses the tokens of a block, from '{' to the matching '}'."""
+        return cls.from_tokens(tokens).parse_block()
+
+    def _start(self, tokens: TokenStream, positions: bool = True, lazy: bool = False) -> None:
+        # FIRST sets of the statements: the token type decides which one to parse
+        self.statement_parsers = {
+            TokenType.RETURN: self.parse_return_statement,
+            TokenType.IF: self.parse_if_statement,
+            TokenType.WHILE: self.parse_while_statement,
+            TokenType.FOR: self.parse_for_statement,
+            TokenType.IDENTIFIER: self.parse_identifier_statements,
+            **{token_type: self.parse_declaration_statement for token_type in self.VARIABLE_TOKENS}
+        }
+        self.tokens = tokens
+        self.keep_positions = positions
+        self.lazy = lazy
+        self.positions = None
+        self.current_token = None
+        self.consume()
 
     def get_current_token_type(self) -> TokenType:
         return self.current_token.type
@@ -58,10 +130,19 @@ class Parser:
         return self.current_token.value
 
     def consume(self) -> Token:
-        self.current_token = self.lexer.get_next_token()
-        while self.get_current_token_type() == TokenType.COMMENT:
-            self.current_token = self.lexer.get_next_token()
+        token = next(self.tokens, None)
+        if token is not None:  # past the end the last token, EOF, stays
+            self.current_token = token
         return self.current_token
+
+    def peek_token(self, k: int = 1) -> Token:
+        """
+        Returns the token k positions after the current one without
+        consuming anything. Comments are skipped, as by consume.
+        """
+        if k == 0:
+            return self.current_token
+        return self.tokens.peek(k - 1)
     
     def get_value_and_consume(self):
         if not self.token_or_null(TokenType.IDENTIFIER):
@@ -108,12 +189,89 @@ class Parser:
         self.require_token(token_type, message)
         self.consume()
 
-    def parse_program(self) -> nodes.Program:
+    def parse_program(self, workers: int | None = 1) -> nodes.Program:
+        """
+        :param workers: Number of processes parsing top-level functions in
+        parallel, os.cpu_count() if None. Scripts too small to split, or
+        with unbalanced braces, are parsed in this process.
+        """
+        functions = None
+        if self.recover:
+            functions = self._parse_recovering()
+        elif workers != 1:
+            functions = self._parse_parallel(workers)
+        if functions is None:
+            functions = []
+            while fundef := self.parse_function():
+                functions.append(fundef) 
+            self.require_token(TokenType.EOF, 'Need EOF at the end of stream')
+        program = nodes.Program(functions)
+        if not self.keep_positions:
+            self.positions = nodes.PositionTable(program)
+        return program
+
+    def _parse_parallel(self, workers: int | None) -> list[nodes.Function] | None:
+        tokens = self.remaining_tokens()
+        functions = parallel.parse_parallel(type(self), tokens, workers, lazy=self.lazy)
+        if functions is None:
+            self._start(TokenStream(tokens, skip_comments=True), self.keep_positions, self.lazy)
+        return functions
+
+    def _parse_recovering(self) -> list[nodes.Function]:
+        """Parses the functions, after an error skipping to the start of the next one."""
         functions = []
-        while fundef := self.parse_function():
-            functions.append(fundef) 
-        self.require_token(TokenType.EOF, 'Need EOF at the end of stream')
-        return nodes.Program(functions)
+        while self.get_current_token_type() != TokenType.EOF:
+            try:
+                if fundef := self.parse_function():
+                    functions.append(fundef)
+                    continue
+                self.require_token(TokenType.EOF, 'Need EOF at the end of stream')
+            except InvalidSyntaxError as error:
+                self.errors.append(error)
+            self.consume()
+            while not self.at_function_start() and self.get_current_token_type() != TokenType.EOF:
+                self.consume()
+        self.errors.sort(key=lambda error: (error.line, error.column))
+        return functions
+
+    def at_function_start(self) -> bool:
+        """Whether the current token starts a function: a type, a name and '('."""
+        return (self.get_current_token_type() in self.FUNCTION_TYPE_TOKENS
+                and self.peek_token(1).type == TokenType.IDENTIFIER
+                and self.peek_token(2).type == TokenType.LPAREN)
+
+    def synchronize(self) -> bool:
+        """
+        Skips the rest of a statement with a syntax error: the tokens up to
+        and including ';' or a block closed by '}', or up to the '}' closing
+        the current block. Returns False, having skipped nothing, at the end
+        of the stream or at the start of a function, where the current block
+        cannot continue.
+        """
+        depth = 0
+        while True:
+            token_type = self.get_current_token_type()
+            if token_type == TokenType.EOF or depth == 0 and self.at_function_start():
+                return False
+            if token_type == TokenType.RBRACE:
+                if depth == 0:
+                    return True
+                depth -= 1
+                self.consume()
+                if depth == 0:
+                    return True
+                continue
+            if token_type == TokenType.LBRACE:
+                depth += 1
+            self.consume()
+            if token_type == TokenType.SEMI and depth == 0:
+                return True
+
+    def remaining_tokens(self) -> list[Token]:
+        """Returns the current token and all tokens after it, without comments, consuming them."""
+        tokens = [self.current_token]
+        tokens.extend(token for token in self.tokens if token.type != TokenType.COMMENT)
+        return tokens
 
     def parse_function(self) -> nodes.Function:
         column = self.current_token.pos[0]
@@ -130,7 +288,7 @@ class Parser:
         self.require_token_and_consume(TokenType.LPAREN, 'You need to open paren before function parametrs')
         parameters = self.parse_function_parameters()
         self.require_token_and_consume(TokenType.RPAREN, 'You need to close paren after function parametrs')
-        block = self.parse_block()
+        block = self.skim_block() if self.lazy else self.parse_block()
         if block == None:
             raise InvalidSyntaxError(self.current_token.pos[0], self.current_token.pos[1],
                                      "Tried to build function block but got None")
@@ -139,7 +297,7 @@ class Parser:
 
 
     def parse_function_type(self) -> nodes.FunctionType:
-        if not self.tokens_or_null(self.VARIABLE_TOKENS + [TokenType.VOID]):
+        if not self.tokens_or_null(self.FUNCTION_TYPE_TOKENS):
             return None
         column = self.current_token.pos[0]
         line = self.current_token.pos[1]
@@ -203,15 +361,54 @@ class Parser:
     def parse_block(self) -> nodes.Block:
         if not self.consume_if_token(TokenType.LBRACE):
             return None
+        if self.recover:
+            return nodes.Block(self._parse_statements_recovering())
         statements = []
         while statement:= self.parse_statement():
             statements.append(statement)
         self.require_token_and_consume(TokenType.RBRACE, 'You need to close Block')
         return nodes.Block(statements)
 
+    def _parse_statements_recovering(self) -> list:
+        """Parses the statements of a block, after an error skipping the statement."""
+        statements = []
+        while True:
+            try:
+                while not self.at_function_start() and (statement := self.parse_statement()):
+                    statements.append(statement)
+                self.require_token_and_consume(TokenType.RBRACE, 'You need to close Block')
+                return statements
+            except InvalidSyntaxError as error:
+                self.errors.append(error)
+                if not self.synchronize():
+                    if (error.column, error.line) != self.current_token.pos:
+                        self.errors.append(InvalidSyntaxError(
+                            self.current_token.pos[0], self.current_token.pos[1], 'You need to close Block'))
+                    return statements
+
+    def skim_block(self) -> nodes.LazyBlock:
+        """Collects the tokens of a block up to the matching '}' without parsing them."""
+        if self.get_current_token_type() != TokenType.LBRACE:
+            return None
+        tokens = []
+        depth = 0
+        while True:
+            token_type = self.get_current_token_type()
+            if token_type == TokenType.LBRACE:
+                depth += 1
+            elif token_type == TokenType.RBRACE:
+                depth -= 1
+            elif token_type == TokenType.EOF:
+                self.require_token(TokenType.RBRACE, 'You need to close Block')
+            tokens.append(self.current_token)
+            self.consume()
+            if depth == 0:
+                return nodes.LazyBlock(tokens, self.parse_body)
+
 
     def parse_statement(self):
-        return self.parse_return_statement() or self.parse_if_statement() or self.parse_while_statement() or self.parse_declaration_statement() or self.parse_identifier_statements()
+        parse = self.statement_parsers.get(self.current_token.type)
+        return parse() if parse else None
 
     def parse_identifier_statements(self):
         identifier = self.parse_identifier()
@@ -289,6 +486,32 @@ class Parser:
                                      "Block for while statement is None")
         return nodes.WhileStatement(condition, block, column, line)
 
+    def parse_for_statement(self) -> nodes.ForStatement:
+        column = self.current_token.pos[0]
+        line = self.current_token.pos[1]
+        if not self.consume_if_token(TokenType.FOR):
+            return None
+        self.require_token_and_consume(TokenType.LPAREN, "Must be open paren for For loop")
+        variable_type = self.parse_variable_type()
+        if variable_type == None:
+            raise InvalidSyntaxError(self.current_token.pos[0], self.current_token.pos[1],
+                                     "Must be type of loop variable in for statement")
+        identifier = self.get_value_and_consume()
+        if identifier == None:
+            raise InvalidSyntaxError(self.current_token.pos[0], self.current_token.pos[1],
+                                     "Must be identifier after type in for statement")
+        self.require_token_and_consume(TokenType.IN, "Must be 'in' after loop variable")
+        iterable = self.parse_expression()
+        if iterable == None:
+            raise InvalidSyntaxError(self.current_token.pos[0], self.current_token.pos[1],
+                                     "Iterable for for statement is None")
+        self.require_token_and_consume(TokenType.RPAREN, "Must be close paren for For loop")
+        block = self.parse_block()
+        if block == None:
+            raise InvalidSyntaxError(self.current_token.pos[0], self.current_token.pos[1],
+                                     "Block for for statement is None")
+        return nodes.ForStatement(variable_type, identifier, iterable, block, column, line)
+
     def parse_declaration_statement(self) -> nodes.DeclarationStatement:
         column = self.current_token.pos[0]
         line = self.current_token.pos[1]
@@ -348,101 +571,26 @@ class Parser:
                 arguments.append(self.parse_expression())
         return arguments
 
-    def parse_expression(self):
-        return self.parse_or_expression()
-
-
-    def parse_or_expression(self):
-        column = self.current_token.pos[0]
-        line = self.current_token.pos[1]
-        left = self.parse_and_expression()
-        if left is None:
-            return None
-        while self.get_current_token_type() == TokenType.OR:
-            operator = OPERATORS[self.get_current_token_type()]
-            self.consume()
-            right = self.parse_and_expression()
-            if right is None:
-                raise InvalidSyntaxError(
-                    self.current_token.pos[0], self.current_token.pos[1],
-                    "Expected expression after 'or' operator."
-                )
-            left = nodes.BinaryExpression(left, operator, right, column, line)
-        return left
-
-    def parse_and_expression(self):
-        column = self.current_token.pos[0]
-        line = self.current_token.pos[1]
-        left = self.parse_comparison_expression()
-        if left is None:
-            return None
-        while self.get_current_token_type() == TokenType.AND:
-            operator = OPERATORS[self.get_current_token_type()]
-            self.consume()
-            right = self.parse_comparison_expression()
-            if right is None:
-                raise InvalidSyntaxError(
-                    self.current_token.pos[0], self.current_token.pos[1],
-                    "Expected expression after 'and' operator."
-                )
-            left = nodes.BinaryExpression(left, operator, right, column, line)
-        return left
-
-    def parse_comparison_expression(self):
-        column = self.current_token.pos[0]
-        line = self.current_token.pos[1]
-        left = self.parse_additive_expression()
-        if left is None:
-            return None
-        while self.get_current_token_type() in self.COMPARISON_TOKENS:
-            operator = OPERATORS[self.get_current_token_type()]
-            self.consume()
-            right = self.parse_additive_expression()
-            if right is None:
-                raise InvalidSyntaxError(
-                    self.current_token.pos[0], self.current_token.pos[1],
-                    "Expected expression after comparison operator."
-                )
-            left = nodes.BinaryExpression(left, operator, right, column, line)
-        return left
-
-    def parse_additive_expression(self):
-        column = self.current_token.pos[0]
-        line = self.current_token.pos[1]
-        left = self.parse_multiplicative_expression()
-        if left is None:
-            return None
-        while self.get_current_token_type() in [TokenType.PLUS, TokenType.MINUS]:
-            operator = OPERATORS[self.get_current_token_type()]
-            self.consume()
-            right = self.parse_multiplicative_expression()
-            if right is None:
-                raise InvalidSyntaxError(
-                    self.current_token.pos[0], self.current_token.pos[1],
-                    "Expected expression after additive operator."
-                )
-            left = nodes.BinaryExpression(left, operator, right, column, line)
-        return left
-
-    def parse_multiplicative_expression(self):
-        column = self.current_token.pos[0]
-        line = self.current_token.pos[1]
+    def parse_expression(self, min_power: int = 1):
+        """
+        Parses a binary expression by precedence climbing. Operators bind
+        as tightly as BINDING_POWERS says and are left-associative, so
+        only operators with at least min_power are taken at this level.
+        """
+        token = self.current_token
         left = self.parse_negation_expression()
         if left is None:
             return None
-        while self.get_current_token_type() in [TokenType.MUL, TokenType.DIV]:
-            operator = OPERATORS[self.get_current_token_type()]
+        while (binding := BINDING_POWERS.get(self.current_token.type)) and binding[0] >= min_power:
+            power, message = binding
+            operator = OPERATORS[self.current_token.type]
             self.consume()
-            right = self.parse_negation_expression()
+            right = self.parse_expression(power + 1)
             if right is None:
-                raise InvalidSyntaxError(
-                    self.current_token.pos[0], self.current_token.pos[1],
-                    "Expected expression after multiplicative operator."
-                )
-            left = nodes.BinaryExpression(left, operator, right, column, line)
+                raise InvalidSyntaxError(self.current_token.pos[0], self.current_token.pos[1], message)
+            left = nodes.BinaryExpression(left, operator, right, token.pos[0], token.pos[1])
         return left
 
-
     def parse_negation_expression(self):
         negated = False
         column = self.current_token.pos[0]
@@ -484,18 +632,24 @@ class Parser:
         ident_or_call = self.parse_identifier_or_call()
         references = []
         while self.consume_if_token(TokenType.DOT):
-            if identifier_call := self.parse_identifier_or_call():
-                if isinstance(identifier_call,nodes.FunctionCallStatement):  # nie potrz references.append(identifier_call)
-                    references.append(nodes.MethodCall(identifier_call.identifier, column, line, identifier_call.arguments))
-                else:
-                    references.append(nodes.MethodCall(identifier_call, column, line))
-            else:
-                raise InvalidSyntaxError(self.current_token.pos[0], self.current_token.pos[1],
-                                    "Was \'.\' but after it didnt get any identifier or call")
+            references.append(self.parse_method_call(column, line))
         if references:
             return nodes.MethodCallExpression(ident_or_call, references, column, line)
         else:
             return ident_or_call
+
+    def parse_method_call(self, column, line) -> nodes.MethodCall:
+        """Parses the name or call after a '.', straight into a MethodCall."""
+        identifier = self.parse_identifier() or self.parse_variable_tokens()
+        if identifier is None:
+            raise InvalidSyntaxError(self.current_token.pos[0], self.current_token.pos[1],
+                                     "Was \'.\' but after it didnt get any identifier or call")
+        if not self.consume_if_token(TokenType.LPAREN):
+            return nodes.MethodCall(identifier, column, line)
+        arguments = self.parse_call_arguments()
+        self.require_token_and_consume(TokenType.RPAREN, 'You need to close RPAREN in function call')
+        return nodes.MethodCall(identifier, column, line, arguments)
+
     def parse_identifier_or_call(self):
         column = self.current_token.pos[0]
         line = self.current_token.pos[1]
@@ -1,5 +1,8 @@
 from interpreter.interpreter import Interpreter
+from interpreter.cache import ASTCache
+from interpreter.optimizer import Optimizer
 import errors.errors as e
+import parser.nodes as nodes
 import pytest
 import io
 
@@ -750,3 +753,194 @@ def test_interpreter_multiple_method_call(capfd):
     interpreter.run()
     captured = capfd.readouterr()
     assert captured.out == '0\n'
+
+
+def test_interpreter_cache_hit(tmp_path):
+    code = 'int main() { int a = 3; return a * 4; }'
+    cache = ASTCache(str(tmp_path))
+    interpreter = Interpreter(io.StringIO(code), cache)
+    assert interpreter.parser is not None
+    assert interpreter.run() == 12
+    interpreter = Interpreter(io.StringIO(code), cache)
+    assert interpreter.parser is None
+    assert interpreter.run() == 12
+    other = Interpreter(io.StringIO(code.replace('4', '5')), cache)
+    assert other.parser is not None
+    assert other.run() == 15
+
+
+def test_interpreter_cache_lazy_then_eager(tmp_path):
+    code = 'int unused() { return ; ; } int main() { return 1; }'
+    cache = ASTCache(str(tmp_path))
+    assert Interpreter(io.StringIO(code), cache, lazy=True).run() == 1
+    assert Interpreter(io.StringIO(code), cache, lazy=True).parser is None
+    interpreter = Interpreter(io.StringIO(code), cache)
+    assert interpreter.parser is not None
+    with pytest.raises(e.InvalidSyntaxError):
+        interpreter.run()
+
+
+def test_interpreter_cache_unreadable_file(tmp_path):
+    code = 'int main() { return 7; }'
+    cache = ASTCache(str(tmp_path))
+    key, _ = cache.key(io.StringIO(code))
+    with open(cache.path(key), 'wb') as f:
+        f.write(b'\x80\x05truncated')
+    interpreter = Interpreter(io.StringIO(code), cache)
+    assert interpreter.parser is not None
+    assert interpreter.run() == 7
+    assert cache.load(key) is not None
+
+
+def test_interpreter_cache_eviction(tmp_path):
+    cache = ASTCache(str(tmp_path), max_size=0)
+    Interpreter(io.StringIO('int main() { return 1; }'), cache).run()
+    assert list(tmp_path.iterdir()) == []
+    cache.max_size = 1 << 20
+    for value in range(3):
+        Interpreter(io.StringIO(f'int main() {{ return {value}; }}'), cache).run()
+    paths = sorted(tmp_path.iterdir(), key=lambda path: path.stat().st_mtime_ns)
+    cache.max_size = sum(path.stat().st_size for path in paths[1:])
+    cache.evict()
+    assert sorted(tmp_path.iterdir()) == sorted(paths[1:])
+
+
+def test_interpreter_lazy_function_bodies():
+    code = 'int unused() { return ; ; } int twice(int a) { return a * 2; } '
+    code += 'int main() { int a = twice(2); return twice(a); }'
+    assert Interpreter(io.StringIO(code), lazy=True).run() == 8
+    with pytest.raises(e.InvalidSyntaxError):
+        Interpreter(io.StringIO(code)).run()
+    interpreter = Interpreter(io.StringIO(code), lazy=True)
+    program = interpreter.parser.parse_program()
+    program.accept(interpreter.visitor)
+    unused, twice, main = program.functions
+    assert isinstance(unused.block, nodes.LazyBlock) and unused.block.block is None
+    assert isinstance(twice.block, nodes.Block) and isinstance(main.block, nodes.Block)
+
+
+def test_interpreter_for_loop(capfd):
+    code = 'int main() { List a = List(1, 2, 3); int s = 0; for (int x in a) { s = s + x; } '
+    code += 'for (int x in a) { print(x); } return s; }'
+    assert Interpreter(io.StringIO(code)).run() == 6
+    captured = capfd.readouterr()
+    assert captured.out == "1\n2\n3\n"
+
+
+def test_interpreter_for_loop_over_method_call(capfd):
+    code = 'int main() { Point a = Point(0, 0, 0); Point b = Point(1, 0, 0); Point c = Point(0, 1, 0);'
+    code += 'Point d = Point(0, 0, 1); Polyhedron p = Polyhedron(Line(a, b), Line(a, c), Line(a, d),'
+    code += 'Line(b, c), Line(b, d), Line(c, d)); int n = 0; for (Point q in p.points()) { n = n + 1; } '
+    code += 'return n; }'
+    assert Interpreter(io.StringIO(code)).run() == 4
+
+
+def test_interpreter_for_loop_over_variables(capfd):
+    code = 'int main() { int a = 5; int b = 2; List l = List(a, b, 3); int s = 0; '
+    code += 'for (int x in l) { s = s + x; } return s; }'
+    assert Interpreter(io.StringIO(code)).run() == 10
+    code = 'int main() { Point a = Point(1, 0, 0); Point b = Point(2, 0, 0); List l = List(a, b); '
+    code += 'for (Point p in l) { print(p.get_x()); } return 0; }'
+    assert Interpreter(io.StringIO(code)).run() == 0
+    captured = capfd.readouterr()
+    assert captured.out == "1\n2\n"
+
+
+def test_interpreter_for_loop_errors():
+    code = 'int main() { List a = List(1, 2.5); for (int x in a) { } return 0; }'
+    with pytest.raises(e.TypeMismatchError):
+        Interpreter(io.StringIO(code)).run()
+    code = 'int main() { int a = 1; for (int x in a) { } return 0; }'
+    with pytest.raises(e.InvalidTypeError):
+        Interpreter(io.StringIO(code)).run()
+    code = 'int main() { List a = List(1); int x = 0; for (int x in a) { } return 0; }'
+    with pytest.raises(e.RedefinitionError):
+        Interpreter(io.StringIO(code)).run()
+
+
+def test_interpreter_for_loop_over_range(capfd):
+    code = 'int main() { int s = 0; int n = 5; for (int i in range(1, n)) { s = s + i; } '
+    code += 'for (int i in range(6, 0, -2)) { print(i); } for (int i in range(3)) { s = s + i; } return s; }'
+    assert Interpreter(io.StringIO(code)).run() == 13
+    captured = capfd.readouterr()
+    assert captured.out == "6\n4\n2\n"
+
+
+@pytest.mark.parametrize("code, error", [
+    ('int main() { for (float i in range(3)) { } return 0; }', e.TypeMismatchError),
+    ('int main() { for (int i in range(1.5)) { } return 0; }', e.InvalidTypeError),
+    ('int main() { for (int i in range(0, 3, 0)) { } return 0; }', e.InvalidTypeError),
+    ('int main() { for (int i in range()) { } return 0; }', e.InvalidNumberOfArgumentsError),
+])
+def test_interpreter_range_errors(code, error):
+    with pytest.raises(error):
+        Interpreter(io.StringIO(code)).run()
+
+
+def test_interpreter_optimize_folds_constants(capfd):
+    code = 'int main() { Point p = Point(2 * 0.5, 3 - 1, 4 / 2); print(p); int a = 2; '
+    code += 'print(-(1 + 2) * a < 3 and !False); print("a" + "b"); return 1 + 2 * 3; }'
+    plain = Interpreter(io.StringIO(code)).run()
+    expected = capfd.readouterr().out
+    interpreter = Interpreter(io.StringIO(code), optimize=True)
+    assert interpreter.run() == plain == 7
+    assert capfd.readouterr().out == expected
+    assert interpreter.optimizer.folded == 8
+    program = interpreter.optimizer.optimize(Interpreter(io.StringIO(code)).parser.parse_program())
+    declaration = program.functions[0].block.statements[0]
+    arguments = declaration.expression.arguments
+    assert [type(argument) for argument in arguments] == [nodes.FloatValue, nodes.IntValue, nodes.FloatValue]
+    assert [argument.value for argument in arguments] == [1.0, 2, 2.0]
+
+
+def test_interpreter_optimize_keeps_runtime_errors():
+    code = 'int main() { if (False) { int x = 1 / 0; } int y = 2 / (1 - 1); return 0; }'
+    with pytest.raises(e.DivisionByZeroError) as plain:
+        Interpreter(io.StringIO(code)).run()
+    with pytest.raises(e.DivisionByZeroError) as optimized:
+        Interpreter(io.StringIO(code), optimize=True).run()
+    assert str(optimized.value) == str(plain.value)
+    code = 'int main() { bool b = !1 + 2; return 0; }'
+    with pytest.raises(e.InvalidTypeError):
+        Interpreter(io.StringIO(code), optimize=True).run()
+
+
+def test_interpreter_optimize_removes_dead_code(capfd):
+    code = 'int main() { int unused = 5; string s; int used = 1; '
+    code += 'if (1 < 2) { print("yes"); } else { print("no"); } while (2 > 3) { print("never"); } '
+    code += 'if (False) { print("gone"); } int x = used + 1; return x; print("dead"); used = 3; }'
+    interpreter = Interpreter(io.StringIO(code), optimize=True)
+    assert interpreter.run() == 2
+    assert capfd.readouterr().out == "yes\n"
+    optimizer = Optimizer()
+    program = optimizer.optimize(Interpreter(io.StringIO(code)).parser.parse_program())
+    statements = program.functions[0].block.statements
+    assert [type(statement) for statement in statements] == [
+        nodes.DeclarationStatement, nodes.FunctionCallStatement, nodes.DeclarationStatement, nodes.ReturnStatement]
+    assert [statement.identifier for statement in (statements[0], statements[2])] == ['used', 'x']
+    assert optimizer.removed == 30
+
+
+@pytest.mark.parametrize("code", [
+    'void f() { print(1); if (False) { } } int main() { f(); return 0; }',
+    'int main() { int a = 1; for (int i in range(2)) { int b = 2; } return a; }',
+    'int main() { int a = 1; int a = 2; return 0; }',
+    'int main() { string a = "b"; print("a"); return 0; }',
+    'void f() { print(1); } int g() { return f(); print(2); return 1; } int main() { return g(); }',
+    'int main() { if (True) { return 3; } return 4; }',
+    'int main() { if (1 < 2) { return 3; } else { return 5; } return 4; }',
+    'int main() { int x = 5; List l = List(x * 1, x + 0); x = 6; int s = 0; '
+    'for (int v in l) { s = s + v; } return s; }',
+])
+def test_interpreter_optimize_keeps_behavior(code, capfd):
+    try:
+        expected = Interpreter(io.StringIO(code)).run()
+    except Exception as error:
+        expected = type(error)
+    expected_out = capfd.readouterr().out
+    try:
+        result = Interpreter(io.StringIO(code), optimize=True).run()
+    except Exception as error:
+        result = type(error)
+    assert result == expected
+    assert capfd.readouterr().out == expected_out
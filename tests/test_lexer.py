@@ -1,5 +1,7 @@
 from lexer.lexer import Lexer, TokenType
-from lexer.source import Source
+from lexer.source import Source, BufferedSource, MmapSource
+from lexer.token_buffer import TokenBuffer
+from lexer.parallel import tokenize_parallel, find_boundaries
 from errors.errors import InvalidTokenError, ExceedsMaxLengthError, UndefEscapeChar
 import pytest
 import re
@@ -78,6 +80,335 @@ def test_source_get_line():
     assert source.get_line(3) == ""
 
 
+def test_source_get_line_keeps_position():
+    source = Source(io.StringIO("a\nb\nc\n"))
+    source.get_next_char()
+    assert source.get_line(3) == "c\n"
+    assert source.get_line(1) == "a\n"
+    assert source.get_line(4) == ""
+    assert source.get_current_char() == '\n'
+    source.get_next_char()
+    assert source.get_current_char() == 'b'
+    assert source.get_position() == (1, 2)
+
+
+def test_source_get_lines():
+    source = Source(io.StringIO("a\r\nb\nc"))
+    assert source.get_lines(range(2, 5)) == ["b\n", "c", ""]
+    while source.get_current_char():
+        source.get_next_char()
+    assert source.get_lines(range(1, 4)) == ["a\n", "b\n", "c"]
+
+
+def test_source_get_line_non_seekable():
+    source = BufferedSource(NonSeekableStream("a\nb\n"))
+    with pytest.raises(io.UnsupportedOperation, match="non-seekable"):
+        source.get_line(2)
+
+
+def test_buffered_source_rn():
+    source = BufferedSource(io.StringIO("\r\n\r\n\ra\r"), block_size=1)
+    assert source.get_current_char() == '\n'
+    assert source.get_position() == (1, 1)
+    source.get_next_char()
+    assert source.get_current_char() == '\n'
+    assert source.get_position() == (1, 2)
+    source.get_next_char()
+    assert source.get_current_char() == '\n'
+    assert source.get_position() == (1, 3)
+    source.get_next_char()
+    assert source.get_current_char() == 'a'
+    assert source.get_position() == (1, 4)
+    source.get_next_char()
+    assert source.get_current_char() == '\n'
+    assert source.get_position() == (2, 4)
+    source.get_next_char()
+    assert source.get_current_char() == ''
+    assert source.get_position() == (1, 5)
+
+
+def test_buffered_source_seek_next_across_blocks():
+    source = BufferedSource(io.StringIO("abc"), block_size=1)
+    assert source.seek_next() == 'b'
+    source.get_next_char()
+    assert source.get_current_char() == 'b'
+    assert source.seek_next() == 'c'
+    source.get_next_char()
+    assert source.seek_next() == ''
+
+
+def test_buffered_source_set_start_position():
+    source = BufferedSource(io.StringIO("ab"), block_size=1)
+    source.get_next_char()
+    assert source.get_position() == (2, 1)
+    source.set_start_position()
+    assert source.get_current_char() == 'a'
+    assert source.get_position() == (1, 1)
+    assert source.get_line(1) == "ab"
+
+
+class NonSeekableStream(io.StringIO):
+    def seekable(self):
+        return False
+
+    def seek(self, *args):
+        raise io.UnsupportedOperation('seek')
+
+    def tell(self):
+        raise io.UnsupportedOperation('tell')
+
+
+@pytest.mark.parametrize("source_class", [Source, BufferedSource])
+def test_source_non_seekable_stream(source_class):
+    text = "int a = 1;\r\nb = a <= 2;"
+    expected = Lexer(source_class(io.StringIO(text))).get_all_tokens()
+    tokens = Lexer(source_class(NonSeekableStream(text))).get_all_tokens()
+    assert [(token.type, token.value, token.pos) for token in tokens] == \
+           [(token.type, token.value, token.pos) for token in expected]
+
+
+def test_source_non_seekable_stream_cannot_restart():
+    source = Source(NonSeekableStream("ab"))
+    source.get_next_char()
+    with pytest.raises(io.UnsupportedOperation):
+        source.set_start_position()
+    source = BufferedSource(NonSeekableStream("abc"), block_size=1)
+    source.get_next_char()
+    source.get_next_char()
+    with pytest.raises(io.UnsupportedOperation):
+        source.set_start_position()
+
+
+@pytest.mark.parametrize("source_class", [Source, BufferedSource])
+def test_source_read_all(source_class):
+    source = source_class(NonSeekableStream("int a;\nb"))
+    assert source.read_all() == "int a;\nb"
+    source = BufferedSource(NonSeekableStream("abc\ndef"), block_size=2)
+    source.get_next_char()
+    assert source.read_all() == "bc\ndef"
+
+
+def test_buffered_source_restart_from_buffer():
+    source = BufferedSource(NonSeekableStream("a\nb"))
+    assert source.advance(2) == 'b'
+    source.set_start_position()
+    assert source.get_current_char() == 'a'
+    assert Lexer(source).get_all_tokens()[1].pos == (1, 2)
+
+
+@pytest.mark.parametrize("block_size", [1, 2, 7, BufferedSource.BLOCK_SIZE])
+def test_buffered_source_same_tokens_as_source(block_size):
+    with open("tests/test_cases/complex_code.txt", 'r') as f:
+        expected = [(token.type, token.value, token.pos) for token in Lexer(Source(f)).get_all_tokens()]
+    with open("tests/test_cases/complex_code.txt", 'r') as f:
+        lexer = Lexer(BufferedSource(f, block_size=block_size))
+        tokens = [(token.type, token.value, token.pos) for token in lexer.get_all_tokens()]
+    assert tokens == expected
+
+
+@pytest.mark.parametrize("block_size", [1, 3, MmapSource.BLOCK_SIZE])
+def test_mmap_source_same_tokens_as_source(tmp_path, block_size):
+    path = tmp_path / "script.txt"
+    path.write_bytes('string ż = "zażółć\\n";\r\nint główna = 12;\r\n# koniec'.encode('utf-8'))
+    with open(path, 'r', encoding='utf-8') as f:
+        expected = [(token.type, token.value, token.pos) for token in Lexer(Source(f)).get_all_tokens()]
+    with MmapSource(str(path), block_size=block_size) as source:
+        tokens = [(token.type, token.value, token.pos) for token in Lexer(source).get_all_tokens()]
+    assert tokens == expected
+
+
+def test_mmap_source_get_line(tmp_path):
+    path = tmp_path / "script.txt"
+    path.write_bytes(b"a\r\nb")
+    with MmapSource(str(path)) as source:
+        assert source.get_line(1) == "a\n"
+        assert source.get_line(2) == "b"
+        assert source.get_line(3) == ""
+        assert source.get_lines(range(1, 3)) == ["a\n", "b"]
+
+
+def test_mmap_source_empty_file():
+    with MmapSource("tests/test_cases/empty_file.txt") as source:
+        tokens = Lexer(source).get_all_tokens()
+    assert len(tokens) == 1
+    assert tokens[0].type == TokenType.EOF
+    assert tokens[0].pos == (1, 1)
+
+
+def tokens_or_error(lexer):
+    try:
+        return [(token.type, token.value, token.pos) for token in lexer.get_all_tokens()]
+    except Exception as error:
+        return type(error), str(error)
+
+
+@pytest.mark.parametrize("text", [
+    "int a = 1;\n while (a < 10) { a = a + 1; }",
+    "== != >= <= < > = ! ( ) { } . , ; + - * /",
+    ' "a\t" "a\n" "a\\\\" "a \r"  "\'a\'" ',
+    "\r\n\ta\r\nb # comment\r\n c",
+    "12 1.5 1. 42.9999 x2 ż1",
+    "1231234124124124124124124",
+    "0.1231234124124124124124124",
+    "a" * 100001,
+    "#" * 100001,
+    '"\\z"',
+    '"Unclosed String',
+    "int a = 14;\nstri%ng b = \"hello\";",
+    "",
+])
+@pytest.mark.parametrize("block_size", [1, 3, BufferedSource.BLOCK_SIZE])
+def test_lexer_table_engine_same_as_classic(text, block_size):
+    expected = tokens_or_error(Lexer(Source(io.StringIO(text))))
+    lexer = Lexer(BufferedSource(io.StringIO(text), block_size=block_size), engine='table')
+    assert tokens_or_error(lexer) == expected
+
+
+def test_lexer_table_engine_file_source():
+    for name in ["all_tokens", "complex_code", "figures", "simple_code", "simple_code_2"]:
+        with open(f"tests/test_cases/{name}.txt", 'r') as f:
+            expected = tokens_or_error(Lexer(Source(f)))
+        with open(f"tests/test_cases/{name}.txt", 'r') as f:
+            assert tokens_or_error(Lexer(BufferedSource(f), engine='table')) == expected
+
+
+def test_lexer_table_engine_needs_buffered_source():
+    with pytest.raises(TypeError):
+        Lexer(Source(io.StringIO("a")), engine='table')
+
+
+def test_lexer_unknown_engine():
+    with pytest.raises(ValueError):
+        Lexer(Source(io.StringIO("a")), engine='regex')
+
+
+def test_lexer_fills_token_buffer():
+    with open("tests/test_cases/complex_code.txt", 'r') as f:
+        expected = [(token.type, token.value, token.pos) for token in Lexer(Source(f)).get_all_tokens()]
+    with open("tests/test_cases/complex_code.txt", 'r') as f:
+        buffer = Lexer(Source(f)).get_all_tokens(TokenBuffer())
+    assert len(buffer) == len(expected)
+    assert [(token.type, token.value, token.pos) for token in buffer] == expected
+    assert buffer[-1].type == TokenType.EOF
+    assert str(buffer.token(0)) == str(buffer[0])
+
+
+def test_token_buffer_interns_values():
+    buffer = Lexer(Source(io.StringIO("a = 1; a = 1.0; b = True; a = 1;"))).get_all_tokens(TokenBuffer())
+    assert buffer.values[0] == buffer.values[4] == buffer.values[12]
+    assert buffer[2].value == 1 and type(buffer[2].value) is int
+    assert buffer[6].value == 1.0 and type(buffer[6].value) is float
+    assert buffer.value_table.count(1) == 2
+    with pytest.raises(IndexError):
+        buffer[len(buffer)]
+
+
+@pytest.mark.parametrize("source_class", [Source, BufferedSource])
+def test_lexer_tokens_store_offsets(source_class):
+    tokens = Lexer(source_class(io.StringIO("a = 1;\r\n  b = \"x\";"))).get_all_tokens()
+    assert [token.offset for token in tokens] == [0, 2, 4, 5, 9, 11, 13, 16, 17]
+    assert tokens[4]._pos is None
+    assert tokens[4].pos == (3, 2)
+    assert tokens[-1].pos == (12, 2)
+
+
+def test_token_buffer_stores_offsets():
+    buffer = Lexer(Source(io.StringIO("a\n  b"))).get_all_tokens(TokenBuffer())
+    assert list(buffer.offsets) == [0, 4, 5]
+    assert [token.pos for token in buffer] == [(1, 1), (3, 2), (5, 2)]
+    assert buffer.token(1).pos == (3, 2)
+
+
+@pytest.mark.parametrize("text", [
+    "a # comment\n  b",
+    "# one\n# two\n\n#three",
+    "a#\r\n#x\rb # " + "c" * 50,
+    "",
+])
+@pytest.mark.parametrize("source_class, engine, block_size", [
+    (Source, 'classic', None),
+    (BufferedSource, 'classic', 2),
+    (BufferedSource, 'table', 1),
+    (BufferedSource, 'table', BufferedSource.BLOCK_SIZE),
+])
+def test_lexer_skip_comments(text, source_class, engine, block_size):
+    def make_source():
+        if source_class is Source:
+            return Source(io.StringIO(text))
+        return BufferedSource(io.StringIO(text), block_size=block_size)
+    expected = [(token.type, token.value, token.pos)
+                for token in Lexer(make_source(), engine=engine).get_all_tokens()
+                if token.type != TokenType.COMMENT]
+    lexer = Lexer(make_source(), engine=engine, skip_comments=True)
+    assert [(token.type, token.value, token.pos) for token in lexer.get_all_tokens()] == expected
+
+
+def test_lexer_skip_comments_ignores_max_length():
+    lexer = Lexer(Source(io.StringIO("# " + "x" * 20 + "\na")), max_string_length=5, skip_comments=True)
+    assert lexer.get_next_token().value == "a"
+
+
+def test_lexer_iter_tokens_peek():
+    stream = Lexer(Source(io.StringIO("a = 1;"))).iter_tokens(lookahead=2)
+    assert stream.peek().value == "a"
+    assert stream.peek(1).type == TokenType.ASSIGN
+    with pytest.raises(ValueError):
+        stream.peek(2)
+    assert next(stream).value == "a"
+    assert [token.type for token in stream] == [TokenType.ASSIGN, TokenType.INT_VALUE,
+                                                TokenType.SEMI, TokenType.EOF]
+    assert stream.peek().type == TokenType.EOF
+    assert next(stream, None) is None
+
+
+def test_lexer_iter_tokens_is_lazy():
+    source = Source(io.StringIO("a b c"))
+    stream = Lexer(source).iter_tokens()
+    assert source.get_current_char() == "a"
+    stream.peek(1)
+    assert source.get_offset() == 3
+    assert len(stream.window) == 2
+
+
+def test_find_boundaries_outside_strings_and_comments():
+    data = b'a\n"x\ny\\"\n"\n# c "\nb\n'
+    boundaries = find_boundaries(data, chunk_size=1)
+    assert boundaries == [0, 2, 11, 17, len(data)]
+
+
+@pytest.mark.parametrize("name", ["all_tokens", "complex_code", "figures", "empty_file"])
+@pytest.mark.parametrize("engine", ['classic', 'table'])
+def test_tokenize_parallel_same_as_serial(name, engine):
+    path = f"tests/test_cases/{name}.txt"
+    with MmapSource(path) as source:
+        expected = [(token.type, token.value, token.pos, token.offset)
+                    for token in Lexer(source, engine=engine).get_all_tokens()]
+    tokens = tokenize_parallel(path, workers=2, chunk_size=64, engine=engine)
+    assert [(token.type, token.value, token.pos, token.offset) for token in tokens] == expected
+
+
+def test_tokenize_parallel_raises_earliest_error(tmp_path):
+    path = tmp_path / "script.txt"
+    path.write_text("a\n" * 20 + "b $\n" + "c\n" * 20 + "@\n")
+    with pytest.raises(InvalidTokenError) as error:
+        tokenize_parallel(str(path), workers=2, chunk_size=8)
+    assert str(error.value) == "Error occured in line 21, column 3: \nInvalid character '$'"
+
+
+@pytest.mark.parametrize("engine", ['classic', 'table'])
+def test_lexer_interns_identifiers(engine):
+    tokens = Lexer(BufferedSource(io.StringIO("scene = scene2 + scene;")), engine=engine).get_all_tokens()
+    assert tokens[0].value == tokens[4].value == "scene"
+    assert tokens[0].value is tokens[4].value
+
+
+@pytest.mark.parametrize("engine", ['classic', 'table'])
+def test_lexer_unicode_characters(engine):
+    tokens = Lexer(BufferedSource(io.StringIO("\u2003zażółć_2 = ٣4;")), engine=engine).get_all_tokens()
+    assert [(token.type, token.value) for token in tokens[:3]] == [
+        (TokenType.IDENTIFIER, "zażółć_2"), (TokenType.ASSIGN, "="), (TokenType.INT_VALUE, 34)]
+
+
 def test_lexer_skip_spaces():
     lexer = Lexer(Source(io.StringIO("              a")))
     token = lexer.get_next_token()
@@ -491,3 +822,15 @@ def test_lexer_file_source_simple_code():
         TokenType.RBRACE,
         TokenType.EOF
     ]
+
+
+@pytest.mark.parametrize("engine", ['classic', 'table'])
+def test_lexer_recover_collects_errors(engine):
+    lexer = Lexer(BufferedSource(io.StringIO('a = $b;\nprint("x\\qy") @')), engine=engine, recover=True)
+    tokens = lexer.get_all_tokens()
+    assert [token.type for token in tokens] == [
+        TokenType.IDENTIFIER, TokenType.ASSIGN, TokenType.IDENTIFIER, TokenType.SEMI,
+        TokenType.IDENTIFIER, TokenType.LPAREN, TokenType.STRING_VALUE, TokenType.RPAREN, TokenType.EOF]
+    assert tokens[6].value == "xqy"
+    assert [(type(error), error.line, error.column) for error in lexer.errors] == [
+        (InvalidTokenError, 1, 5), (UndefEscapeChar, 2, 10), (InvalidTokenError, 2, 15)]
@@ -1,10 +1,19 @@
 from lexer.lexer import Lexer
-from errors.errors import InvalidSyntaxError
+from errors.errors import (InvalidSyntaxError, InvalidTokenError, UndefEscapeChar, ExceedsMaxLengthError,
+                           UnclosedStringError)
 from lexer.source import Source
-from parser.parser import Parser
+from lexer.tokens import TokenType
+from lexer.token_buffer import TokenBuffer
+from parser.parser import Parser, Operators
+from parser.incremental import IncrementalParser
+from parser.indexed import IndexedParser
+from parser.parallel import parse_parallel, split
 import parser.nodes as nodes
 import pytest
+import random
 import io
+import gc
+import tracemalloc
 
 
 def test_parser_file_source_empty_file():
@@ -302,6 +311,42 @@ def test_parser_negation_expression_with_parenthesis():
     assert program.functions[0].block.statements[0].condition.expression.name == 'a'
 
 
+def test_parser_expression_left_associative():
+    parser = Parser(Lexer(Source(io.StringIO('a - b - c * d / e'))))
+    expression = parser.parse_expression()
+    assert expression.operator == Operators.MINUS
+    assert expression.left.operator == Operators.MINUS
+    assert expression.left.left.name == 'a'
+    assert expression.right.operator == Operators.DIV
+    assert expression.right.left.operator == Operators.MUL
+    assert (expression.right.column, expression.right.line) == (9, 1)
+    assert (expression.left.column, expression.left.line) == (1, 1)
+
+
+def test_parser_expression_binding_powers():
+    parser = Parser(Lexer(Source(io.StringIO('a or b and -c < d + 1'))))
+    expression = parser.parse_expression()
+    assert expression.operator == Operators.OR
+    assert expression.right.operator == Operators.AND
+    assert expression.right.right.operator == Operators.LESS
+    assert isinstance(expression.right.right.left, nodes.NegationExpression)
+    assert expression.right.right.right.operator == Operators.PLUS
+
+
+@pytest.mark.parametrize("text, message", [
+    ('a or', "Expected expression after 'or' operator."),
+    ('a and b and', "Expected expression after 'and' operator."),
+    ('a <= )', "Expected expression after comparison operator."),
+    ('a * b + ;', "Expected expression after additive operator."),
+    ('a + b / }', "Expected expression after multiplicative operator."),
+])
+def test_parser_expression_missing_operand(text, message):
+    parser = Parser(Lexer(Source(io.StringIO(text))))
+    with pytest.raises(InvalidSyntaxError) as error:
+        parser.parse_expression()
+    assert str(error.value).endswith(message)
+
+
 def test_parser_method_call_expression():
     source = Source(io.StringIO('int main() { return a.length(); }'))
     lexer = Lexer(source)
@@ -336,6 +381,236 @@ def test_parser_skip_comment():
     assert isinstance(program.functions[0].block.statements[0], nodes.ReturnStatement)
 
 
+def test_parser_lazy_function_bodies():
+    text = 'int f(int a) { if (a > 1) { return a; } # c\n return 0; }\nint main() { return f(2); }'
+    expected = Parser(Lexer(Source(io.StringIO(text)))).parse_program()
+    program = Parser(Lexer(Source(io.StringIO(text))), lazy=True).parse_program()
+    body = program.functions[0].block
+    assert isinstance(body, nodes.LazyBlock)
+    assert body.tokens[0].type == TokenType.LBRACE and body.tokens[-1].type == TokenType.RBRACE
+    assert all(token.type != TokenType.COMMENT for token in body.tokens)
+    assert repr(program.functions[1].block.get_block()) == repr(expected.functions[1].block)
+    assert repr(body.get_block()) == repr(expected.functions[0].block)
+    assert body.tokens is None
+
+
+def test_parser_lazy_unclosed_body():
+    parser = Parser(Lexer(Source(io.StringIO('int main() { if (a) { return 1; }'))), lazy=True)
+    with pytest.raises(InvalidSyntaxError):
+        parser.parse_program()
+
+
+def test_parser_method_call_chain_nodes():
+    parser = Parser(Lexer(Source(io.StringIO('a.b(1, 2).c'))))
+    expression = parser.parse_expression()
+    assert isinstance(expression, nodes.MethodCallExpression)
+    first, second = expression.methods
+    assert isinstance(first, nodes.MethodCall) and first.name.name == 'b' and len(first.arguments) == 2
+    assert second.name.name == 'c' and second.arguments is None
+
+
+@pytest.mark.parametrize("name", ["complex_code", "figures", "simple_code", "simple_code_2"])
+def test_indexed_parser_same_tree(name):
+    with open(f"tests/test_cases/{name}.txt", 'r') as f:
+        text = f.read()
+    expected = tree_with_positions(Parser(Lexer(Source(io.StringIO(text)))).parse_program())
+    tokens = list(Lexer(Source(io.StringIO(text))).iter_tokens())  # with comments
+    buffer = TokenBuffer()
+    for token in Lexer(Source(io.StringIO(text)), skip_comments=True).iter_tokens():
+        buffer.append(token)
+    assert tree_with_positions(IndexedParser(Lexer(Source(io.StringIO(text)))).parse_program()) == expected
+    assert tree_with_positions(IndexedParser.from_tokens(tokens).parse_program()) == expected
+    assert tree_with_positions(IndexedParser.from_tokens(buffer).parse_program()) == expected
+
+
+def test_indexed_parser_mark_reset():
+    parser = IndexedParser(Lexer(Source(io.StringIO('# c\nint a = 1 + ;'))))
+    assert parser.current_token.type == TokenType.INT
+    assert parser.peek_token(3).type == TokenType.INT_VALUE
+    assert parser.peek_token(100).type == TokenType.EOF
+    mark = parser.mark()
+    parser.consume()
+    parser.consume()
+    parser.reset(mark)
+    assert parser.current_token.type == TokenType.INT
+    assert parser.speculate(parser.parse_declaration_statement) is None
+    assert parser.current_token.type == TokenType.INT
+    parser.consume()
+    assert parser.speculate(parser.parse_identifier).name == 'a'
+    assert parser.current_token.type == TokenType.ASSIGN
+
+
+def parallel_test_script():
+    with open("tests/test_cases/complex_code.txt", 'r') as f:
+        text = f.read().replace('int main', 'int main_1') + '\n'
+    with open("tests/test_cases/simple_code_2.txt", 'r') as f:
+        return text * 3 + f.read()
+
+
+def test_parser_split_at_top_level_braces():
+    tokens = list(Lexer(Source(io.StringIO('int f() { if (a) { } } void g() { }'))).iter_tokens())
+    buffer = TokenBuffer()
+    for token in tokens:
+        buffer.append(token)
+    assert split(buffer.types, 1) == [(0, 12), (12, 18), (18, 19)]
+    assert split(buffer.types, 15) == [(0, 18), (18, 19)]
+    assert split(buffer.types[:-2], 1) is None
+
+
+@pytest.mark.parametrize("parser_class", [Parser, IndexedParser])
+def test_parser_parallel_same_as_serial(parser_class):
+    text = parallel_test_script()
+    expected = tree_with_positions(parser_class(Lexer(Source(io.StringIO(text)))).parse_program())
+    tokens = list(Lexer(Source(io.StringIO(text)), skip_comments=True).iter_tokens())
+    functions = parse_parallel(parser_class, tokens, workers=2, chunk_tokens=50)
+    assert tree_with_positions(nodes.Program(functions)) == expected
+    program = parser_class(Lexer(Source(io.StringIO(text)))).parse_program(workers=2)
+    assert tree_with_positions(program) == expected
+
+
+def test_parser_parallel_raises_earliest_error():
+    text = parallel_test_script()
+    lines = text.split('\n')
+    lines[30] += ' int x'
+    lines[60] += ' (('
+    text = '\n'.join(lines)
+    with pytest.raises(InvalidSyntaxError) as serial:
+        Parser(Lexer(Source(io.StringIO(text)))).parse_program()
+    tokens = list(Lexer(Source(io.StringIO(text)), skip_comments=True).iter_tokens())
+    with pytest.raises(InvalidSyntaxError) as parallel:
+        parse_parallel(Parser, tokens, workers=2, chunk_tokens=20)
+    assert str(parallel.value) == str(serial.value)
+    assert 'line 32' in str(serial.value)
+
+
+def tree_with_positions(program):
+    return [(type(node).__name__, tuple(value for name in nodes.fields(type(node))
+                                        for value in [getattr(node, name)]
+                                        if not isinstance(value, (nodes.Node, list))))
+            for node in nodes.walk(program)]
+
+
+def test_incremental_parser_reuses_functions():
+    text = 'int f() {\n  return 1;\n}\nint g() {\n  return 2;\n}\nint main() {\n  return 3;\n}\n'
+    incremental = IncrementalParser(text)
+    f, g, main = incremental.program.functions
+    program = incremental.edit(text.index('return 2'), 0, 'int a = 5;\n  ')
+    assert program.functions[0] is f and program.functions[2] is main
+    assert program.functions[1] is not g
+    assert main.line == 8 and main.block.statements[0].line == 9
+    assert incremental.text == text.replace('return 2', 'int a = 5;\n  return 2')
+
+
+def test_incremental_parser_random_edits():
+    with open("tests/test_cases/complex_code.txt", 'r') as f:
+        text = f.read() + '\n'
+    with open("tests/test_cases/simple_code_2.txt", 'r') as f:
+        text = text.replace('int main', 'int main_1') + f.read()
+    snippets = ['', ' ', '\n', 'a', '}', '{', '#', '"', ';', ' a = 1;', '\n    print(3);',
+                '\nint f() { return 1; }\n', '}\nint h() {']
+    rng = random.Random(7)
+    incremental = IncrementalParser(text)
+    for _ in range(150):
+        offset = rng.randrange(len(incremental.text) + 1)
+        removed = min(rng.choice([0, 0, 1, 3, 10]), len(incremental.text) - offset)
+        inserted = rng.choice(snippets)
+        old = incremental.text[offset:offset + removed]
+        text = incremental.text[:offset] + inserted + incremental.text[offset + removed:]
+        try:
+            expected = tree_with_positions(Parser(Lexer(Source(io.StringIO(text)))).parse_program())
+        except Exception as error:
+            with pytest.raises(type(error)) as raised:
+                incremental.edit(offset, removed, inserted)
+            assert str(raised.value) == str(error)
+            incremental.edit(offset, len(inserted), old)  # undo
+            continue
+        assert tree_with_positions(incremental.edit(offset, removed, inserted)) == expected
+
+
+def test_parser_nodes_have_slots():
+    program = Parser(Lexer(Source(io.StringIO('int main() { int a = 1 + 2; }')))).parse_program()
+    for node in nodes.walk(program):
+        assert not hasattr(node, '__dict__')
+
+
+def test_parser_positions_side_table():
+    text = 'int main() {\n    int a = 1 + 2;\n    return a;\n}'
+    expected = Parser(Lexer(Source(io.StringIO(text)))).parse_program()
+    parser = Parser(Lexer(Source(io.StringIO(text))), positions=False)
+    program = parser.parse_program()
+    declaration = program.functions[0].block.statements[0]
+    assert declaration.line is None and declaration.column is None
+    assert len(parser.positions) == sum(1 for node in nodes.walk(expected) if hasattr(node, 'line'))
+    for node, original in zip(nodes.walk(program), nodes.walk(expected)):
+        if hasattr(node, 'line'):
+            assert parser.positions.position(node) == (original.column, original.line)
+    assert parser.positions.position(declaration.expression) == (13, 2)
+
+
+
+def measure_tree(text, positions):
+    tokens = Lexer(Source(io.StringIO(text))).get_all_tokens()
+    parser = Parser.from_tokens(tokens, positions=positions)
+    gc.collect()
+    tracemalloc.start()
+    program = parser.parse_program()
+    del tokens
+    parser.tokens = None
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return size
+
+
+def test_parser_positions_table_saves_memory():
+    with open("tests/test_cases/complex_code.txt", 'r') as f:
+        text = f.read() * 20
+    measure_tree(text, False)  # fills the caches of isinstance checks first
+    assert measure_tree(text, False) < measure_tree(text, True) * 0.9
+
+
+def test_parser_positions_table_lazy():
+    text = 'int f() {\n    int a = 1;\n    return a;\n}\nint main(int b) {\n    return f();\n}'
+    parser = Parser(Lexer(Source(io.StringIO(text))), positions=False, lazy=True)
+    program = parser.parse_program()
+    assert program.functions[0].block.get_block().statements[0].line == 2
+    main = program.functions[1]
+    assert parser.positions.position(main) == (1, 5)
+    assert parser.positions.position(main.parameters[0]) == (10, 5)
+
+
+def test_parser_lexer_skips_comments():
+    lexer = Lexer(Source(io.StringIO('# header\n# more\nint main() { return 7; } # end')))
+    parser = Parser(lexer)
+    assert not lexer.skip_comments  # the lexer is used as it was created
+    assert parser.current_token.type == TokenType.INT
+    program = parser.parse_program()
+    assert len(program.functions) == 1
+
+
+def test_parser_peek_token_skips_comments():
+    parser = Parser(Lexer(Source(io.StringIO('int # a\n # b\n # c\n # d\n main() { }'))))
+    assert parser.peek_token().type == TokenType.IDENTIFIER
+    assert parser.peek_token(2).type == TokenType.LPAREN
+    assert len(parser.parse_program().functions) == 1
+
+
+def test_parser_peek_token():
+    parser = Parser(Lexer(Source(io.StringIO('int main() { }'))))
+    assert parser.peek_token(0).type == TokenType.INT
+    assert parser.peek_token().type == TokenType.IDENTIFIER
+    assert parser.peek_token(2).type == TokenType.LPAREN
+    assert parser.current_token.type == TokenType.INT
+
+
+def test_parser_from_tokens():
+    tokens = Lexer(Source(io.StringIO('# c\nint main() { return 7; }'))).get_all_tokens()
+    assert tokens[0].type == TokenType.COMMENT
+    program = Parser.from_tokens(tokens).parse_program()
+    assert program.functions[0].identifier == 'main'
+    assert isinstance(program.functions[0].block.statements[0], nodes.ReturnStatement)
+
+
 def test_parser_void_function():
     source = Source(io.StringIO('void foo() { print("foo"); }'))
     lexer = Lexer(source)
@@ -398,3 +673,74 @@ def test_complex_code_structure():
     assert main_function.identifier.name == "main"
     assert main_function.function_type.type == "int"
 
+
+
+RECOVER_SCRIPT = """int f(int a) {
+    int x = ;
+    a = a + $ 1;
+    if (a > ) { a = 2; }
+    print("b\\q");
+    return a
+}
+void g() {
+    x = 3;
+int h() {
+    return 1;
+}
+"""
+
+UNCLOSED_SCRIPT = """int main() {
+    int x = 12345;
+    print("abc);
+}
+"""
+
+
+@pytest.mark.parametrize("parser_class", [Parser, IndexedParser])
+def test_parser_recover_collects_errors(parser_class):
+    parser = parser_class(Lexer(Source(io.StringIO(RECOVER_SCRIPT)), recover=True))
+    program = parser.parse_program()
+    assert [function.identifier for function in program.functions] == ['f', 'g', 'h']
+    assert len(program.functions[0].block.statements) == 2
+    assert [(type(error), error.line, error.column) for error in parser.errors] == [
+        (InvalidSyntaxError, 2, 13),
+        (InvalidTokenError, 3, 13),
+        (InvalidSyntaxError, 4, 13),
+        (UndefEscapeChar, 5, 14),
+        (InvalidSyntaxError, 7, 1),
+        (InvalidSyntaxError, 10, 1),
+    ]
+    with pytest.raises(InvalidTokenError):  # a lexer created without recover=True raises its errors
+        parser_class(Lexer(Source(io.StringIO(RECOVER_SCRIPT))), recover=True).parse_program()
+
+    # too long tokens are kept whole, an unclosed string ends at the end of the source
+    parser = parser_class(Lexer(Source(io.StringIO(UNCLOSED_SCRIPT)), max_int_length=3, recover=True))
+    program = parser.parse_program()
+    assert program.functions[0].block.statements[0].expression.value == 12345
+    assert [(type(error), error.line, error.column) for error in parser.errors] == [
+        (ExceedsMaxLengthError, 2, 16),
+        (UnclosedStringError, 3, 11),
+        (InvalidSyntaxError, 5, 2),
+    ]
+
+
+def test_parser_recover_valid_script():
+    with open("tests/test_cases/complex_code.txt", 'r') as f:
+        text = f.read()
+    expected = tree_with_positions(Parser(Lexer(Source(io.StringIO(text)))).parse_program())
+    parser = Parser(Lexer(Source(io.StringIO(text))), recover=True)
+    assert tree_with_positions(parser.parse_program()) == expected
+    assert parser.errors == []
+
+
+def test_parser_for_statement():
+    code = 'int main() { for (Point p in poly.points()) { print(p); } }'
+    program = Parser(Lexer(Source(io.StringIO(code)))).parse_program()
+    statement = program.functions[0].block.statements[0]
+    assert isinstance(statement, nodes.ForStatement)
+    assert statement.variable_type.type == 'Point'
+    assert statement.identifier == 'p'
+    assert isinstance(statement.iterable, nodes.MethodCallExpression)
+    assert len(statement.block.statements) == 1
+    with pytest.raises(InvalidSyntaxError):
+        Parser(Lexer(Source(io.StringIO('int main() { for (p in a) { } }')))).parse_program()